@@ -3,6 +3,10 @@ import evennia.commands.default as default_cmds
 from evennia.utils import logger
 from evennia.utils.ansi import ANSIString
 from evennia.utils.search import object_search
+from evennia.objects.models import ObjectDB
+from traits.models import CharacterTrait
+from world.data import GameDataError, reload_data
+from world.statsearch import STAT_INDEX, SearchError, average, search
 from .command import Command
 
 HELP_CATEGORY = "admin"
@@ -20,6 +24,9 @@ class AdminCmdSet(CmdSet):
     def at_cmdset_creation(self):
         super().at_cmdset_creation()
         self.add(CmdEmit())
+        self.add(CmdSyncStats())
+        self.add(CmdReloadData())
+        self.add(CmdStatSearch())
 
 
 class AdminAccountCmdSet(CmdSet):
@@ -117,6 +124,131 @@ class CmdEmit(Command):
                 self.msg(f"You are not allowed to emit to {objname}.")
 
 
+class CmdSyncStats(Command):
+    """
+    copy every character's stats into the traits table
+
+    Usage:
+      syncstats
+
+    Stats are copied into the traits table whenever they change.  This
+    copies the ones that haven't changed since the table was added, so
+    staff searches see every character.
+    """
+
+    key = "syncstats"
+    locks = "cmd:perm(Developer)"
+    help_category = HELP_CATEGORY
+
+    def func(self):
+        count = 0
+        for obj in ObjectDB.objects.get_by_attribute(key="stats"):
+            if obj.db.stats:
+                CharacterTrait.objects.sync(obj, obj.db.stats)
+                count += 1
+        STAT_INDEX.reset()
+
+        self.msg("Synced the stats of %s characters." % count)
+
+
+class CmdReloadData(Command):
+    """
+    reload the game data files
+
+    Usage:
+      reloaddata
+
+    Re-reads the trait tables in world/gamedata without reloading the
+    server.  If a file has a mistake in it, the error is shown and the game
+    keeps the data it had.
+    """
+
+    key = "reloaddata"
+    locks = "cmd:perm(Developer)"
+    help_category = HELP_CATEGORY
+
+    def func(self):
+        try:
+            count = reload_data()
+        except GameDataError as err:
+            self.msg("|rGame data was not reloaded:|n %s" % err)
+            return
+
+        self.msg("Game data reloaded: %s traits." % count)
+        logger.log_info("Game data reloaded by %s." % self.caller)
+
+
+class CmdStatSearch(Command):
+    """
+    search every character's stats
+
+    Usage:
+      statsearch <filter>[, <filter>...]
+      statsearch/avg <trait> [by <trait>] [where <filter>[, <filter>...]]
+
+    A filter is a trait on its own, which matches characters who have it,
+    or a trait compared to a value with = != > >= < or <=.  Every filter
+    has to match.  splat, approved, approved_by and notes can be searched
+    as well as traits.
+
+    Examples:
+      statsearch dominate>=4, approved
+      statsearch splat=vampire, approved=no
+      statsearch/avg humanity by clan where approved
+    """
+
+    key = "statsearch"
+    switch_options = ("avg",)
+    locks = "cmd:perm(Builder)"
+    help_category = HELP_CATEGORY
+
+    # the most names listed for one search.
+    max_names = 100
+
+    def func(self):
+        if not self.args:
+            self.msg("Usage: statsearch <filter>[, <filter>...]")
+            return
+
+        try:
+            if "avg" in self.switches:
+                self.show_average()
+            else:
+                self.show_search()
+        except SearchError as err:
+            self.msg("|wSEARCH>|n %s" % err)
+
+    def show_search(self):
+        ids = search(self.args)
+        names = sorted(
+            ObjectDB.objects.filter(id__in=ids).values_list("db_key", flat=True),
+            key=str.lower,
+        )
+        output = "|wSEARCH>|n |w%s|n character%s match." % (
+            len(names), "" if len(names) == 1 else "s")
+        if names:
+            output += "\n" + ", ".join(names[:self.max_names])
+            if len(names) > self.max_names:
+                output += ", and %s more." % (len(names) - self.max_names)
+        self.msg(output)
+
+    def show_average(self):
+        args, _, query = self.args.partition(" where ")
+        trait, _, by = args.partition(" by ")
+        averages = average(trait, by.strip() or None, query)
+        if not averages:
+            self.msg("|wSEARCH>|n No characters match.")
+            return
+
+        output = ["|wSEARCH>|n Average |w%s|n:" % trait.strip()]
+        for group, (mean, count) in sorted(
+            averages.items(), key=lambda x: str(x[0])
+        ):
+            label = "all" if group is None and not by.strip() else group
+            output.append("  %s: |w%.2f|n (%s)" % (label or "none", mean, count))
+        self.msg("\n".join(output))
+
+
 class CmdPuppet(Command):
     """
     control an object you have permission to puppet
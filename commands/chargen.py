@@ -3,19 +3,141 @@ This module contains the commands for character generation.
 
 """
 
+import yaml
 from evennia.commands.cmdset import CmdSet
 from world.data import (
-    get_trait_list,
+    resolve_trait,
     SPLATS,
     STATS,
 )
 from evennia.utils.ansi import ANSIString
+from world.powers import (
+    broken_dependents,
+    missing_requirements,
+    requirement_message,
+)
+from world.snapshots import take_snapshot
+from world.stats import StatsTransaction, stats_changed
+from traits.models import split_key
 from .utils import target
 from jobs.commands.commands import CmdJob
 from .command import Command
 
 HELP_CATEGORY = "character"
 
+# the longest sheet stat/import will read.
+MAX_SHEET_LENGTH = 10000
+
+
+def snapshot_reason(caller):
+    """Changes made by staff are kept in the sheet's history."""
+    if caller.locks.check_lockstring(caller, "perm(Admin)"):
+        return "edited by %s" % caller.name
+    return None
+
+
+def stat_value(spec, value, specialty=""):
+    """
+    Return value, as typed, the way stat stores it for spec's trait:
+    numbers as int and other trait values in lower case.  Specialties of a
+    trait with no list of them, like a skill's, are kept as typed.
+    """
+    value = str(value).strip()
+    if specialty and not spec.specialties:
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return value if specialty else value.lower()
+
+
+def batch_entry(name, value, specialty=""):
+    """
+    Return a (key, instance, value, specialty) entry for stat/batch from
+    a trait name like contacts(police) and its value.  The value is left
+    as text for stat_value.
+    """
+    key, instance = split_key(str(name).strip().lower())
+    return (key, instance, str(value).strip(), str(specialty).strip())
+
+
+def parse_batch(text):
+    """
+    Parse stat/batch's <trait>:<value>[/<specialty>], ... list into entries.
+    Returns (entries, errors).
+    """
+    entries = []
+    errors = []
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, sep, value = part.partition(":")
+        if not sep or not value.strip():
+            errors.append("|w%s|n needs a value, e.g. strength:3." % part.strip())
+            continue
+        value, _, specialty = value.partition("/")
+        if specialty.strip():
+            entries.append(batch_entry(name, value, specialty))
+        else:
+            entries.append(batch_entry(name, value))
+    return entries, errors
+
+
+def parse_sheet(text):
+    """
+    Parse a YAML or JSON sheet for stat/import into entries.  The sheet is
+    either a flat mapping of traits to values, or laid out like db.stats,
+    with categories and a specialties mapping.  Trait names must be text
+    and values numbers or text.  Returns (entries, errors).
+    """
+    # YAML aliases make a short text a huge sheet, so nothing that isn't
+    # a name or a value is ever turned into a string.
+    if len(text) > MAX_SHEET_LENGTH:
+        return [], [
+            "The sheet is too long, it can be up to %s characters."
+            % MAX_SHEET_LENGTH
+        ]
+    try:
+        sheet = yaml.safe_load(text)
+    except yaml.YAMLError as err:
+        return [], ["The sheet could not be read: %s" % err]
+
+    if not isinstance(sheet, dict):
+        return [], ["The sheet must be a mapping of traits to values."]
+
+    entries = []
+    errors = []
+
+    def add(trait, value, specialty=""):
+        if not isinstance(trait, str) or not isinstance(specialty, str):
+            errors.append("Trait and specialty names must be text.")
+        elif not isinstance(value, (str, int)):
+            errors.append(
+                "|w%s|n must be a number or text." % (specialty or trait))
+        else:
+            entries.append(batch_entry(trait, value, specialty))
+
+    for name, value in sheet.items():
+        if not isinstance(name, str):
+            errors.append("Trait and specialty names must be text.")
+        elif name.lower() == "specialties" and isinstance(value, dict):
+            for trait, specialties in value.items():
+                if not isinstance(trait, str):
+                    errors.append("Trait and specialty names must be text.")
+                elif not isinstance(specialties, dict):
+                    errors.append(
+                        "Specialties for |w%s|n must be a mapping." % trait)
+                else:
+                    for specialty, level in specialties.items():
+                        add(trait, level, specialty)
+        elif isinstance(value, dict):
+            # a category, e.g. attributes: {strength: 3}
+            for trait, level in value.items():
+                add(trait, level)
+        else:
+            add(name, value)
+    return entries, errors
+
 
 class ChargenCmdSet(CmdSet):
     key = "Chargen"
@@ -99,8 +221,9 @@ class CmdSplat(Command):
             return
 
         # set the splat
-        target.db.stats["splat"] = splat.lower()
-        target.db.stats["bio"] = {"splat": splat.lower()}
+        with StatsTransaction(target, snapshot=snapshot_reason(self.caller)) as stats:
+            stats["splat"] = splat.lower()
+            stats["bio"] = {"splat": splat.lower()}
 
         self.caller.msg(
             "|wSPLAT>|n |c{}'s|n splat has set to |w{}|n.".format(
@@ -139,6 +262,21 @@ class CmdStat(Command):
 
                 stat athletics=/Running
 
+        To set many traits at once, for instance to port a sheet from
+        another game, use:
+
+            stat/batch [<target>=]<trait>:<value>[/<specialty>], ...
+            stat/import [<target>=]<sheet>
+
+        where <sheet> is YAML or JSON, either a mapping of traits to
+        values or laid out by category like the sheet itself:
+
+            stat/batch str:3, dex:2, athletics:2, athletics:1/Running
+            stat/import {attributes: {strength: 3}, skills: {brawl: 2}}
+
+        Everything is checked first and all the problems are reported
+        together.  Nothing is set unless every trait is valid.
+
         To reset your whole sheet use |rstats/wipe|n.
 
     See also:  splat sheet
@@ -165,6 +303,7 @@ class CmdStat(Command):
             # if the command was stats/wipe me=confirm, then wipe the stats.
             if self.switches[0] == "wipe" and self.rhs == "confirm":
                 self.caller.db.stats = STATS
+                stats_changed(self.caller)
                 self.caller.msg("|wSTATS>|n Your stats have been wiped.")
                 return
 
@@ -184,6 +323,10 @@ class CmdStat(Command):
             self.caller.msg("|wSTATS>|n Usage: stat <trait>=<value>")
             return
 
+        if "batch" in self.switches or "import" in self.switches:
+            self.batch_stats()
+            return
+
         if not self.rhs and "+" in self.lhs or "-" in self.lhs:
             # this is an add or subtract shortcut.  first we need to prep the + or -.
             args = self.lhs.replace(" + ", " +").replace(" - ", " -")
@@ -214,21 +357,197 @@ class CmdStat(Command):
                 )
             return
 
+        # make every change in one transaction, so the stats are saved once.
+        with StatsTransaction(tar, snapshot=snapshot_reason(self.caller)) as stats:
+            self.update_stats(tar, stats, key, instance, value, specialty)
+            self.warn_dependents(stats, key, specialty)
+
+    def warn_dependents(self, stats, key, specialty):
+        """
+        Warn about the powers that needed key, or its specialty if one was
+        given, and no longer have what they require.
+        """
+        spec, _ = resolve_trait(key)
+        trait = specialty or (spec and spec.trait)
+        for power in broken_dependents(stats, trait):
+            self.caller.msg(
+                "|wSTATS>|n Warning: |w%s|n no longer has its prerequisites.  %s"
+                % (power, requirement_message(missing_requirements(stats, power)))
+            )
+
+    def batch_stats(self):
+        """
+        Handle stat/batch and stat/import: check every trait, then set them
+        all in one transaction.
+        """
+        tar = self.caller
+        text = self.args
+        name, sep, rest = self.args.partition("=")
+        if sep and ":" not in name:
+            tar = self.caller.search(name.strip(), global_search=True)
+            if not tar:
+                return
+            text = rest
+
+        if self.caller != tar and not self.caller.locks.check_lockstring(
+            self.caller, "perm(Admin)"
+        ):
+            self.caller.msg("|wSTATS>|n You can only set your own stats.")
+            return
+
+        if not tar.db.stats or not tar.db.stats["splat"]:
+            self.caller.msg(
+                "|wSTATS>|n You must set |c%s's|n splat first."
+                % tar.get_display_name(self.caller)
+            )
+            return
+
+        if "import" in self.switches:
+            entries, errors = parse_sheet(text)
+        else:
+            entries, errors = parse_batch(text)
+
+        transaction = StatsTransaction(tar, snapshot=snapshot_reason(self.caller))
+        with transaction as stats:
+            errors += self.apply_batch(stats, entries)
+            if errors:
+                transaction.rollback()
+
+        if errors:
+            self.caller.msg(
+                "|wSTATS>|n Nothing was set.  Fix these and try again:\n"
+                + "\n".join("  " + error for error in errors)
+            )
+            return
+
+        self.caller.msg(
+            "|wSTATS>|n Set |w%s|n traits on |c%s's|n sheet."
+            % (len(entries), tar.get_display_name(self.caller))
+        )
+
+    def apply_batch(self, stats, entries):
+        """
+        Check and set entries on stats.  Trait values are set before
+        specialties, and trait checks and power prerequisites run last, so
+        that a sheet can satisfy its own prerequisites.  Returns a list of
+        errors.
+        """
+        errors = []
+        checks = {}
+        specialties = []
+        powers = []
+
+        for key, instance, value, specialty in entries:
+            spec, candidates = resolve_trait(key)
+            if not spec and candidates:
+                errors.append(
+                    "|w%s|n is ambiguous.  Did you mean: |w%s|n?"
+                    % (key, ", ".join(x.trait for x in candidates))
+                )
+                continue
+            if not spec:
+                errors.append("|w%s|n is not a valid trait." % key)
+                continue
+
+            name = spec.trait
+            if instance and not spec.instanced:
+                errors.append("|w%s|n does not have instances." % name)
+                continue
+            if spec.instanced and not instance:
+                errors.append(
+                    "You must specify an (instance) for |w%s()|n." % name.upper())
+                continue
+            if spec.instances and instance not in spec.instances:
+                errors.append(
+                    "|w%s|n is not a valid instance for |w%s()|n.  Valid "
+                    "instances are: |w%s|n."
+                    % (instance, name.upper(), ", ".join(spec.instances))
+                )
+                continue
+            if instance:
+                name = "%s(%s)" % (name.capitalize(), instance.capitalize())
+
+            value = stat_value(spec, value, specialty)
+            if specialty:
+                if not spec.has_specialties:
+                    errors.append("|w%s|n does not have specialties." % name)
+                    continue
+                if spec.specialties:
+                    if specialty not in spec.specialties:
+                        errors.append(
+                            "|w%s|n is not a valid specialty for |w%s|n."
+                            % (specialty, name.upper())
+                        )
+                        continue
+                    values = spec.specialties[specialty]["values"]
+                    level = value.lower() if isinstance(value, str) else value
+                    if level not in values:
+                        errors.append(
+                            "|w%s|n is not a valid value for |w%s|n."
+                            % (value, specialty.upper())
+                        )
+                        continue
+                specialties.append((spec, name, specialty, value))
+                continue
+
+            if spec.values and value not in spec.value_set:
+                errors.append(
+                    "|w%s|n is not a valid value for |w%s|n.  Valid values "
+                    "are: |w%s|n." % (
+                        value, name.upper(), ", ".join(map(str, spec.values)))
+                )
+                continue
+
+            stats.setdefault(spec.category, {})[name] = value
+            checks[spec.trait] = spec
+
+        for spec, name, specialty, value in specialties:
+            if not stats.get(spec.category, {}).get(name):
+                errors.append(
+                    "|w%s|n needs a value before it can have the specialty "
+                    "|w%s|n." % (name, specialty)
+                )
+                continue
+            stats.setdefault("specialties", {}).setdefault(name, {})[
+                specialty] = value
+            checks[spec.trait] = spec
+            powers.append(specialty)
+
+        for spec in checks.values():
+            if spec.check and not spec.check(stats):
+                errors.append(spec.check_message)
+
+        for power in powers:
+            missing = missing_requirements(stats, power)
+            if missing:
+                errors.append(
+                    "|w%s|n: %s" % (power, requirement_message(missing)))
+
+        return errors
+
+    def update_stats(self, tar, stats, key, instance, value, specialty):
+        """
+        Apply the change to stats, tar's stats inside a StatsTransaction.
+        """
         # check for a valid key
-        traits = get_trait_list(key)
-        try:
-            key = traits.get("trait")
-        except AttributeError:
+        traits, candidates = resolve_trait(key)
+        if not traits and candidates:
+            self.caller.msg(
+                "|wSTATS>|n |w%s|n is ambiguous.  Did you mean: |w%s|n?"
+                % (key, ", ".join(x.trait for x in candidates))
+            )
+            return
+        if not traits:
             self.caller.msg("|wSTATS>|n That is not a valid trait.")
             return
+        key = traits.trait
 
         # check for good values
         try:
             if value and value[0] == "+" or value[0] == "-":
                 try:
                     self.rhs = int(
-                        tar.db.stats[traits.get(
-                            "category")][traits.get("trait")]
+                        stats[traits.category][traits.trait]
                     ) + int(value)
                     self.caller.msg(value)
                 except ValueError:
@@ -248,53 +567,53 @@ class CmdStat(Command):
             pass
 
         # check to see if we pass the check
-        if traits["check"]:
-            if not traits["check"](tar.db.stats):
-                self.caller.msg("|wSTATS>|n> " + traits["check_message"])
+        if traits.check:
+            if not traits.check(stats):
+                self.caller.msg("|wSTATS>|n> " + traits.check_message)
                 return
 
         # check for instance
-        if instance and traits.get("instanced"):
+        if instance and traits.instanced:
             key = "%s(%s)" % (key.capitalize(),
                               instance.capitalize().split("=")[0])
 
-        elif instance and not traits.get("instanced"):
+        elif instance and not traits.instanced:
             self.caller.msg("|wSTATS>|n That trait does not have instances.")
             return
 
-        elif not instance and traits.get("instanced"):
+        elif not instance and traits.instanced:
             self.caller.msg(
                 "|wSTATS>|n You must specify an (instance) for |w%s()|n."
-                % traits.get("trait").upper()
+                % traits.trait.upper()
             )
             return
 
         # if there are instances given and insance isn't oneo of them, then error.
-        if traits.get("instances"):
-            if instance and instance not in traits.get("instances"):
+        if traits.instances:
+            if instance and instance not in traits.instances:
                 self.caller.msg(
                     "|wSTATS>|n |w%s|n is not a valid instance for |w%s()|n."
-                    % (instance, traits.get("trait").upper())
+                    % (instance, traits.trait.upper())
                 )
                 self.caller.msg(
                     "|wSTATS>|n Valid instances are: |w%s|n."
-                    % ", ".join(traits.get("instances"))
+                    % ", ".join(traits.instances)
                 )
                 return
 
         # check for spwcialties [<value>][/<specialty>]
         # to set a specialty, you must set a value and have a value in the key trait first.
-        if traits.get("has_specialties") and value and specialty:
+        if traits.has_specialties and value and specialty:
             # check for a valid specialty or if no specialties exist, set the value
-            if not len(traits["specialties"]):
-                print(traits.get("category"))
+            if not len(traits.specialties):
+                print(traits.category)
                 # set the  character's trait  if the trait exists
-                if tar.db.stats[traits.get("category")].get(key):
+                if stats[traits.category].get(key):
                     # update the specialties dictionary entry for the specialty under the key.
                     try:
-                        tar.db.stats["specialties"][key][specialty] = value
+                        stats["specialties"][key][specialty] = value
                     except KeyError:
-                        tar.db.stats["specialties"][key] = {specialty: value}
+                        stats["specialties"][key] = {specialty: value}
 
                     self.caller.msg(
                         "|wSTATS>|n Specialty |w%s|n set on |c%s's|n |w%s|n."
@@ -305,7 +624,7 @@ class CmdStat(Command):
 
             # Else there are specalties defined.  Check for a valid specialty and value
             # check for a valid specialty
-            if specialty not in traits["specialties"]:
+            if specialty not in traits.specialties:
                 self.caller.msg(
                     "|wSTATS>|n That is not a valid specialty for |w%s|n." % key.upper()
                 )
@@ -314,20 +633,23 @@ class CmdStat(Command):
                     % ", ".join(
                         map(
                             lambda x: ANSIString(f"|w{x}|n"),
-                            traits["specialties"].keys(),
+                            traits.specialties.keys(),
                         )
                     )
                 )
                 return
 
-            try:
-                value = int(value)
-            except ValueError:
-                pass
+            # check the power's prerequisites.
+            missing = missing_requirements(stats, specialty)
+            if missing:
+                self.caller.msg("|wSTATS>|n " + requirement_message(missing))
+                return
+
+            value = stat_value(traits, value, specialty)
 
             # check for a valid value
             try:
-                if value.lower() not in traits["specialties"][specialty]["values"]:
+                if value.lower() not in traits.specialties[specialty]["values"]:
                     self.caller.msg(
                         "|wSTATS>|n That is not a valid value for |w%s|n."
                         % (specialty.upper() or key.upper())
@@ -337,24 +659,24 @@ class CmdStat(Command):
                         % ", ".join(
                             map(
                                 lambda x: ANSIString(f"|w{x}|n"),
-                                traits["specialties"][specialty]["values"],
+                                traits.specialties[specialty]["values"],
                             )
                         )
                     )
 
                     return
                 else:
-                    print(tar.db.stats[traits.get("category")].get(key))
+                    print(stats[traits.category].get(key))
                     # set the  character's trait  if the trait exists
-                    if tar.db.stats[traits.get("category")].get(key):
+                    if stats[traits.category].get(key):
                         # update the specialties dictionary entry for the specialty under the key.
                         try:
-                            tar.db.stats["specialties"][key][specialty] = value
+                            stats["specialties"][key][specialty] = value
                         except KeyError:
-                            tar.db.stats["specialties"][key] = {
+                            stats["specialties"][key] = {
                                 specialty: value}
                         except AttributeError:
-                            tar.db.stats["specialties"] = {
+                            stats["specialties"] = {
                                 key: {specialty: value}}
 
                         self.caller.msg(
@@ -364,7 +686,7 @@ class CmdStat(Command):
 
                         return
             except AttributeError:
-                if value not in traits["specialties"][specialty]["values"]:
+                if value not in traits.specialties[specialty]["values"]:
                     self.caller.msg(
                         "|wSTATS>|n That is not a valid value for |w%s|n."
                         % (specialty.upper() or key.upper())
@@ -374,24 +696,24 @@ class CmdStat(Command):
                         % ", ".join(
                             map(
                                 lambda x: ANSIString(f"|w{x}|n"),
-                                traits["specialties"][specialty]["values"],
+                                traits.specialties[specialty]["values"],
                             )
                         )
                     )
 
                     return
                 else:
-                    print(tar.db.stats[traits.get("category")].get(key))
+                    print(stats[traits.category].get(key))
                     # set the  character's trait  if the trait exists
-                    if tar.db.stats[traits.get("category")].get(key):
+                    if stats[traits.category].get(key):
                         # update the specialties dictionary entry for the specialty under the key.
                         try:
-                            tar.db.stats["specialties"][key][specialty] = value
+                            stats["specialties"][key][specialty] = value
                         except KeyError:
-                            tar.db.stats["specialties"][key] = {
+                            stats["specialties"][key] = {
                                 specialty: value}
                         except AttributeError:
-                            tar.db.stats["specialties"] = {
+                            stats["specialties"] = {
                                 key: {specialty: value}}
 
                         self.caller.msg(
@@ -409,8 +731,8 @@ class CmdStat(Command):
         # if no value is given and a matching specialty for the key is found (case insenstiive)
         # then remove the specialty from the character.
         try:
-            if not value and tar.db.stats["specialties"].get(key).get(specialty):
-                del tar.db.stats["specialties"][key][specialty]
+            if not value and stats["specialties"].get(key).get(specialty):
+                del stats["specialties"][key][specialty]
                 self.caller.msg(
                     "|wSTATS>|n Specialty |w%s|n removed from |c%s's|n |w%s|n."
                     % (specialty, tar.name, key.upper())
@@ -423,24 +745,24 @@ class CmdStat(Command):
         # if the trait is an attribute, then just reset it to 1.
         if not value and not specialty:
             if "temp" in self.switches:
-                if tar.db.stats["temp"].get(key):
-                    del tar.db.stats["temp"][key]
+                if stats["temp"].get(key):
+                    del stats["temp"][key]
                 self.caller.msg(
                     "|wSTATS>|n (temp) |w%s|n removed from |c%s's|n sheet."
                     % (key.upper(), tar.name)
                 )
                 return
             else:
-                if tar.db.stats["specialties"].get(key):
-                    del tar.db.stats["specialties"][key]
-                if tar.db.stats[traits.get("category")].get(key):
-                    if traits.get("category") == "attributes":
-                        tar.db.stats[traits.get("category")][key] = 1
+                if stats["specialties"].get(key):
+                    del stats["specialties"][key]
+                if stats[traits.category].get(key):
+                    if traits.category == "attributes":
+                        stats[traits.category][key] = 1
                     else:
-                        del tar.db.stats[traits.get("category")][key]
+                        del stats[traits.category][key]
                     # if there's a temp value remove it as well
-                    if tar.db.stats["temp"].get(key):
-                        del tar.db.stats["temp"][key]
+                    if stats["temp"].get(key):
+                        del stats["temp"][key]
 
                 self.caller.msg(
                     "|wSTATS>|n |w%s|n removed from |c%s's|n sheet."
@@ -459,7 +781,7 @@ class CmdStat(Command):
             display_key = key
 
         # check for valid values
-        if traits["values"] and self.rhs not in traits["values"]:
+        if traits.values and self.rhs not in traits.value_set:
             self.caller.msg(
                 "|wSTATS>|n That is not a valid value for |w%s|n." % display_key
             )
@@ -467,7 +789,7 @@ class CmdStat(Command):
                 "|wSTATS>|n Valid values are: |w%s|n"
                 % ", ".join(
                     map(lambda x: ANSIString(
-                        f"|w{x}|n").capitalize(), traits["values"])
+                        f"|w{x}|n").capitalize(), traits.values)
                 )
             )
             return
@@ -475,13 +797,13 @@ class CmdStat(Command):
         # set the value
         if "temp" in self.switches:
             try:
-                tar.db.stats["temp"][key] = int(self.rhs)
+                stats["temp"][key] = int(self.rhs)
             except KeyError:
-                tar.db.stats["temp"] = {}
-                tar.db.stats["temp"][key] = int(self.rhs)
+                stats["temp"] = {}
+                stats["temp"][key] = int(self.rhs)
 
             except ValueError:
-                tar.db.stats["temp"][key] = self.rhs
+                stats["temp"][key] = self.rhs
 
             self.caller.msg(
                 "|wSTATS>|n |c%s's|n (temp) |w%s|n set to|w %s|n."
@@ -490,10 +812,10 @@ class CmdStat(Command):
             return
         else:
             try:
-                tar.db.stats[traits.get("category")][key] = self.rhs.lower()
+                stats[traits.category][key] = self.rhs.lower()
                 display = self.rhs.upper()
             except AttributeError:
-                tar.db.stats[traits.get("category")][key] = self.rhs
+                stats[traits.category][key] = self.rhs
                 display = self.rhs
 
             self.caller.msg(
@@ -543,6 +865,7 @@ class CmdSubmit(Command):
         )
         self.caller.msg("|wSTATS>|n Application submitted.")
         caller.db.submitted = True
+        take_snapshot(caller, "submitted")
 
 
 class CmdApprove(Command):
@@ -576,7 +899,8 @@ class CmdApprove(Command):
             caller.msg("|wAPPROVE>|n Character already approved.")
             return
 
-        char.db.stats["approved"] = True
-        char.db.stats["approved_by"] = caller.name
+        with StatsTransaction(char, snapshot="approved by %s" % caller.name) as stats:
+            stats["approved"] = True
+            stats["approved_by"] = caller.name
 
         caller.msg("|wAPPROVE>|n Character approved.")
@@ -1,7 +1,8 @@
 
 from evennia.commands.cmdset import CmdSet
+from world.dice import get_roller
+from world.stats import stats_changed
 from .command import Command
-import random
 
 
 class V5CmdSet(CmdSet):
@@ -31,7 +32,7 @@ class CmdRouse(Command):
 
     def func(self):
         if self.caller.db.stats["bio"]["splat"] == "vampire":
-            roll = random.randint(1, 10)
+            roll = get_roller(self.caller).roll_die()
 
             try:
                 if self.caller.db.stats["pools"]["hunger"] + 1 > 5:
@@ -39,6 +40,7 @@ class CmdRouse(Command):
                     return
             except KeyError:
                 self.caller.db.stats["pools"]["hunger"] = 0
+                stats_changed(self.caller, "pools")
 
             if roll > 6:
                 self.caller.location.msg_contents(
@@ -59,6 +61,7 @@ class CmdRouse(Command):
                     self.caller.db.stats["pools"]["hunger"] += 1
                 except KeyError:
                     self.caller.db.stats["pools"]["hunger"] = 1
+                stats_changed(self.caller, "pools")
 
                 self.caller.msg(
                     "|hGame>|n Curent hunger: |r%s|n"
@@ -94,6 +97,7 @@ class CmdSlake(Command):
                 return
         except KeyError:
             self.caller.db.stats["pools"]["hunger"] = 0
+            stats_changed(self.caller, "pools")
             self.caller.msg("You have no hunger to slake.")
             return
 
@@ -103,6 +107,7 @@ class CmdSlake(Command):
                 return
             else:
                 self.caller.db.stats["pools"]["hunger"] -= number
+                stats_changed(self.caller, "pools")
                 self.caller.msg("You slake %s hunger." % number)
                 self.caller.msg(
                     "Current hunger: |r%s|n" % self.caller.db.stats["pools"]["hunger"]
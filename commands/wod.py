@@ -1,8 +1,9 @@
-import random
 from evennia.utils.ansi import ANSIString
 from evennia.commands.cmdset import CmdSet
 from jobs.commands.commands import CmdJob
+from traits.models import SheetSnapshot
 from .command import Command
+from .utils import format
 from world.data import (
     BIO,
     get_trait_list,
@@ -11,6 +12,34 @@ from world.data import (
     SOCIAL,
     SKILLS,
 )
+from world.dice import (
+    compile_pool,
+    evaluate_pool,
+    get_roller,
+    pool_label,
+    replay,
+)
+from world.odds import MAX_POOL, pool_odds
+from world.powers import available_powers
+from world.snapshots import diff_flat, flatten, snapshot_flat
+from world.stats import cached_render
+
+# the most pools roll/bulk takes in one go.
+MAX_BULK_POOLS = 20
+
+
+# how wide the sheet is drawn.
+SHEET_WIDTH = 78
+
+# each section of the sheet: the stat categories it shows, and the CmdSheet
+# method that renders it.
+SHEET_SECTIONS = {
+    "bio": (("bio", "splat"), "render_bio"),
+    "attributes": (("attributes", "temp"), "render_attributes"),
+    "skills": (("skills", "specialties", "temp"), "render_skills"),
+    "advantages": (("advantages", "flaws"), "render_advantages"),
+    "disciplines": (("disciplines", "specialties"), "render_disciplines"),
+}
 
 
 class WoDCmdSet(CmdSet):
@@ -22,6 +51,7 @@ class WoDCmdSet(CmdSet):
     def at_cmdset_creation(self):
         super().at_cmdset_creation()
         self.add(CmdSheet())
+        self.add(CmdPowers())
         self.add(CmdDice())
 
 
@@ -32,6 +62,12 @@ class CmdSheet(Command):
 
     Usage:
         sheet [<target>]
+        sheet/history [<target>]
+        sheet/diff [<target>=]<number>
+
+    sheet/history lists the snapshots taken of the sheet, when it was
+    submitted, approved or changed by staff.  sheet/diff shows what changed
+    between a snapshot and the sheet as it is now.
 
     See also: stats, splat
     """
@@ -41,27 +77,32 @@ class CmdSheet(Command):
     locks = "cmd:all()"
     help_category = "character"
 
-    def show_bio(self, target):
+    def render_header(self, target):
         """
-        This method shows the bio of a character.
+        This method renders the sheet header.  It depends on who is looking,
+        so it isn't cached.
         """
-        # first print the header.
-        output = ANSIString(
+        return ANSIString(
             "|Y[|n |wCharacter Sheet|n for: |c{}|n |Y]|n".format(
                 target.get_display_name(self.caller)
             )
-        ).center(78, ANSIString("|R=|n"))
+        ).center(SHEET_WIDTH, ANSIString("|R=|n"))
+
+    def render_bio(self, target):
+        """
+        This method renders the bio of a character.
+        """
         bio = []
 
         for item in BIO:
             traits = get_trait_list(item)
 
-            if traits["check"] and not traits["check"](target.db.stats):
+            if traits.check and not traits.check(target.db.stats):
                 continue
 
             # if the bio field passes the check, we add it to the list.
             try:
-                val = target.db.stats[traits.get("category")][item].split(" ")
+                val = target.db.stats[traits.category][item].split(" ")
                 val = " ".join([x.capitalize() for x in val])
                 bio.append(
                     ANSIString(
@@ -73,40 +114,30 @@ class CmdSheet(Command):
                 bio.append(ANSIString(
                     format(item, "", width=38, just="ljust")))
             except AttributeError:
-                val = target.db.stats[traits.get("category")][item]
+                val = target.db.stats[traits.category][item]
                 bio.append(ANSIString(
                     format(item, val, width=38, just="ljust")))
 
-        # Noq peint the bio in two columns.
-        count = 0
-        for i in range(0, len(bio)):
-            if count % 2 == 0:
-                output += "\n "
-            else:
-                output += " "
+        # Now print the bio in two columns.
+        lines = []
+        for i in range(0, len(bio), 2):
+            lines.append(" " + " ".join(str(x) for x in bio[i:i + 2]))
 
-            count += 1
-            output += bio[i]
+        return "\n".join(lines)
 
-        self.caller.msg(output)
-
-    def show_attributes(self, target):
+    def render_attributes(self, target):
         """
-        This method shows the attributes of a character.
+        This method renders the attributes of a character.
         """
-        self.caller.msg(ANSIString("|w Attributes |n").center(
-            78, ANSIString("|R=|n")))
+        header = ANSIString("|w Attributes |n").center(
+            SHEET_WIDTH, ANSIString("|R=|n"))
         # first we need to build our three lists.
         mental = []
         physical = []
         social = []
 
         # Do they have a tempstat?
-        try:
-            if not target.db.stats["temp"]:
-                target.db.stats["temp"] = {}
-        except KeyError:
-            target.db.stats["temp"] = {}
+        temps = target.db.stats.get("temp") or {}
 
         # now we need to sort the attributes into their lists.
         # check if they have a temp value.  if so, record it.
@@ -114,8 +145,8 @@ class CmdSheet(Command):
         try:
             strength = target.db.stats["attributes"]["strength"]
             temp_strength = 0
-            if target.db.stats["temp"].get("strength"):
-                temp_strength = target.db.stats["temp"]["strength"] or 0
+            if temps.get("strength"):
+                temp_strength = temps["strength"] or 0
         except KeyError:
             strength = 0
             temp_strength = 0
@@ -123,8 +154,8 @@ class CmdSheet(Command):
         try:
             dexterity = target.db.stats["attributes"]["dexterity"]
             temp_dexterity = 0
-            if target.db.stats["temp"].get("dexterity"):
-                temp_dexterity = target.db.stats["temp"]["dexterity"] or 0
+            if temps.get("dexterity"):
+                temp_dexterity = temps["dexterity"] or 0
         except KeyError:
             dexterity = 0
             temp_dexterity = 0
@@ -132,8 +163,8 @@ class CmdSheet(Command):
         try:
             stamina = target.db.stats["attributes"]["stamina"]
             temp_stamina = 0
-            if target.db.stats["temp"].get("stamina"):
-                temp_stamina = target.db.stats["temp"]["stamina"] or 0
+            if temps.get("stamina"):
+                temp_stamina = temps["stamina"] or 0
         except KeyError:
             stamina = 0
             temp_stamina = 0
@@ -141,8 +172,8 @@ class CmdSheet(Command):
         try:
             charisma = target.db.stats["attributes"]["charisma"]
             temp_charisma = 0
-            if target.db.stats["temp"].get("charisma"):
-                temp_charisma = target.db.stats["temp"]["charisma"] or 0
+            if temps.get("charisma"):
+                temp_charisma = temps["charisma"] or 0
         except KeyError:
             charisma = 0
             temp_charisma = 0
@@ -150,8 +181,8 @@ class CmdSheet(Command):
         try:
             manipulation = target.db.stats["attributes"]["manipulation"]
             temp_manipulation = 0
-            if target.db.stats["temp"].get("manipulation"):
-                temp_manipulation = target.db.stats["temp"]["manipulation"] or 0
+            if temps.get("manipulation"):
+                temp_manipulation = temps["manipulation"] or 0
         except KeyError:
             manipulation = 0
             temp_manipulation = 0
@@ -159,8 +190,8 @@ class CmdSheet(Command):
         try:
             composure = target.db.stats["attributes"]["composure"]
             temp_composure = 0
-            if target.db.stats["temp"].get("composure"):
-                temp_composure = target.db.stats["temp"]["comppsure"] or 0
+            if temps.get("composure"):
+                temp_composure = temps["composure"] or 0
         except KeyError:
             composure = 0
             temp_composure = 0
@@ -168,33 +199,33 @@ class CmdSheet(Command):
         try:
             resolve = target.db.stats["attributes"]["resolve"]
             temp_resolve = 0
-            if target.db.stats["temp"].get("resolve"):
-                temp_resolve = target.db.stats["temp"]["resolve"] or 0
+            if temps.get("resolve"):
+                temp_resolve = temps["resolve"] or 0
         except KeyError:
             resolve = 0
             temp_resolve = 0
 
         try:
             intelligence = target.db.stats["attributes"]["intelligence"]
-            temp_intelliegence = 0
-            if target.db.stats["temp"].get("intelliegence"):
-                temp_intelliegence = target.db.stats["temp"]["intelliegence"] or 0
+            temp_intelligence = 0
+            if temps.get("intelligence"):
+                temp_intelligence = temps["intelligence"] or 0
         except KeyError:
             intelligence = 0
-            temp_intelliegence = 0
+            temp_intelligence = 0
 
         try:
             wits = target.db.stats["attributes"]["wits"]
             temp_wits = 0
-            if target.db.stats["temp"].get("wits"):
-                temp_wits = target.db.stats["temp"]["wits"] or 0
+            if temps.get("wits"):
+                temp_wits = temps["wits"] or 0
         except KeyError:
             wits = 0
             temp_wits = 0
 
         # Now we need to format the output.
         mental.append(format("Intelligence", intelligence,
-                      temp=temp_intelliegence))
+                      temp=temp_intelligence))
         mental.append(format("Wits", wits, temp=temp_wits))
         mental.append(format("Resolve", resolve, temp=temp_resolve))
 
@@ -208,27 +239,23 @@ class CmdSheet(Command):
         social.append(format("Composure", composure, temp=temp_composure))
 
         # Now we need to print the output.
-        output = (
-            "Physical".center(26) + "Mental".center(26) +
-            "Social".center(26) + "\n"
-        )
+        lines = [
+            str(header),
+            "Physical".center(26) + "Mental".center(26) + "Social".center(26),
+        ]
         for i in range(0, 3):
-            output += " "
-            output += physical[i]
-            output += "  "
-            output += mental[i]
-            output += "  "
-            output += social[i]
-            output += "\n"
+            lines.append(
+                " " + str(physical[i]) + "  " + str(mental[i]) + "  " + str(social[i]))
 
-        self.caller.msg(output.rstrip())
+        return "\n".join(lines)
 
-    def show_skills(self, target):
+    def render_skills(self, target):
         """
-        This method shows the skills of a character.
+        This method renders the skills of a character.
         """
-        self.caller.msg(ANSIString("|w Skills |n").center(
-            78, ANSIString("|R=|n")))
+        lines = [str(ANSIString("|w Skills |n").center(
+            SHEET_WIDTH, ANSIString("|R=|n")))]
+        temps = target.db.stats.get("temp") or {}
         # first we need to build our three lists.
         mental = []
         physical = []
@@ -250,7 +277,7 @@ class CmdSheet(Command):
             keys = [(PHYSICAL, physical), (MENTAL, mental), (SOCIAL, social)]
             for i in keys:
                 if key in i[0]:
-                    temp = target.db.stats["temp"].get(key) or 0
+                    temp = temps.get(key) or 0
 
                     i[1].append(format(key, value, temp=temp))
                     if specialties:
@@ -284,81 +311,64 @@ class CmdSheet(Command):
                 social.append(" " * 24)
         # now we need to print the lists.
         for i in range(longest):
-            output = " " + physical[i]
-            output += "  " + mental[i]
-            output += "  " + social[i]
+            lines.append(
+                " " + str(physical[i]) + "  " + str(mental[i]) + "  " + str(social[i]))
 
-            self.caller.msg(output)
+        return "\n".join(lines)
 
-    def show_disciplines(self, target):
+    def render_disciplines(self, target):
         """
-        This method shows the disciplines of a character.
+        This method renders the disciplines of a character.
         """
-        output = ANSIString("|w Disciplines |n").center(
-            78, ANSIString("|R=|n"))
-
-        # first we build our two list
+        header = ANSIString("|w Disciplines |n").center(
+            SHEET_WIDTH, ANSIString("|R=|n"))
 
-        disciplines = []
+        # build one column per discipline, with its powers under it.
         columns = []
         for key, value in target.db.stats["disciplines"].items():
-            disciplines.append(format(key, value, width=24))
+            column = [str(format(key, value, width=24))]
             specialties = target.db.stats["specialties"].get(key)
 
             if specialties:
                 for specialty in specialties:
-                    disciplines.append(
-                        format(
+                    column.append(
+                        str(format(
                             specialty,
                             specialties.get(specialty),
                             type="specialty",
                             width=24,
-                        )
+                        ))
                     )
-            columns.append(disciplines)
-            disciplines = []
+            columns.append(column)
 
-        # for each column, get the longest entry and pad the rest of the entries to match.
+        if not columns:
+            return ""
+
+        # pad every column to the longest one.
+        max_length = max(len(column) for column in columns)
         for column in columns:
-            try:
-                max_length = max(len(columns[0]), len(
-                    columns[1]), len(columns[2]))
-            except IndexError:
-                try:
-                    max_length = max(len(columns[0]), len(columns[1]))
-                except IndexError:
-                    max_length = len(columns[0])
-
-            if len(column) < max_length:
-                for i in range(max_length - len(column)):
-                    column.append(" " * 24)
-
-        # now we need to print the lists by row.  Two columns per row. if we have more than 2 columns, we need to print
-        # the first two columns, then the next two columns, etc.
-        # if we have an odd number of columns, we need to print the last column by itself.
-        # if we have an even number of columns, we need to print the last two columns together.
-        # if we have more than 4 columns, we need to print the first two columns, then the next two columns, etc.
+            column.extend([" " * 24] * (max_length - len(column)))
+
+        # now print the columns three to a row, with a blank line between
+        # each group of three.
+        lines = [str(header)]
         for i in range(0, len(columns), 3):
+            if i:
+                lines.append("")
             for j in range(max_length):
-                output += "\n "
-                output += columns[i][j]
-                if i + 1 < len(columns):
-                    output += "  " + columns[i + 1][j]
-                if i + 2 < len(columns):
-                    output += "  " + columns[i + 2][j]
+                lines.append(
+                    " " + "  ".join(column[j] for column in columns[i:i + 3]))
 
-            if i + 3 < len(columns):
-                output += "\n"
+        return "\n".join(lines)
 
-        if len(columns) > 0:
-            self.caller.msg(output.strip())
-
-    def show_advantages(self, target):
+    def render_advantages(self, target):
         """
-        This method shows the advantages of a character.
+        This method renders the advantages of a character.
         """
-        output = ANSIString("|w Advantages |n").center(39, ANSIString("|R=|n"))
-        output += ANSIString("|w Flaws |n").center(39, ANSIString("|R=|n"))
+        lines = [
+            str(ANSIString("|w Advantages |n").center(39, ANSIString("|R=|n")))
+            + str(ANSIString("|w Flaws |n").center(39, ANSIString("|R=|n")))
+        ]
 
         # first we build our two lists.
         raw_advantages = target.db.stats["advantages"]
@@ -383,17 +393,94 @@ class CmdSheet(Command):
 
         # now we need to print the lists.
         for i in range(max_length):
-            output += "\n " + advantages[i] + "  " + flaws[i]
+            lines.append(" " + str(advantages[i]) + "  " + str(flaws[i]))
         if max_length > 0:
-            self.caller.msg(output)
+            return "\n".join(lines)
+        return ""
+
+    def render_section(self, target, section):
+        """
+        Return a rendered section of target's sheet.  Sections are cached on
+        the target and only re-rendered when the stats they show change.
+        """
+        categories, render = SHEET_SECTIONS[section]
+        return cached_render(
+            target,
+            ("sheet", section, SHEET_WIDTH),
+            categories,
+            getattr(self, render),
+        )
+
+    def show_history(self, target):
+        """List the snapshots of target's sheet."""
+        snapshots = SheetSnapshot.objects.filter(character=target).order_by(
+            "number")
+        if not snapshots:
+            self.caller.msg("|wSTATS>|n There is no history for that sheet.")
+            return
+
+        output = [
+            str(ANSIString("|w Sheet History |n").center(
+                SHEET_WIDTH, ANSIString("|R=|n")))
+        ]
+        for snapshot in snapshots:
+            output.append(
+                " |w%4s|n  %s  %s"
+                % (
+                    snapshot.number,
+                    snapshot.created_at.strftime("%Y-%m-%d %H:%M"),
+                    snapshot.reason,
+                )
+            )
+        output.append("|R" + "=" * SHEET_WIDTH + "|n")
+        self.caller.msg("\n".join(output))
+
+    def show_diff(self, target, number):
+        """Show what changed between snapshot number and the current sheet."""
+        try:
+            snapshot = SheetSnapshot.objects.get(
+                character=target, number=int(number))
+        except (ValueError, SheetSnapshot.DoesNotExist):
+            self.caller.msg("|wSTATS>|n There is no snapshot %s." % number)
+            return
+
+        changes = diff_flat(snapshot_flat(snapshot), flatten(target.db.stats))
+        if not changes:
+            self.caller.msg(
+                "|wSTATS>|n Nothing has changed since snapshot %s." % number)
+            return
+
+        output = [
+            "|wSTATS>|n Changes since snapshot |w%s|n (%s):"
+            % (number, snapshot.reason)
+        ]
+        for path, old, new in changes:
+            output.append(
+                "  |w%s|n: %s -> %s"
+                % ("/".join(path), "-" if old is None else old,
+                   "-" if new is None else new)
+            )
+        self.caller.msg("\n".join(output))
 
     def func(self):
+        # sheet/diff takes the snapshot number after the target, if any.
+        name = self.args
+        number = None
+        if "diff" in self.switches:
+            if self.rhs:
+                name, number = self.lhs, self.rhs
+            else:
+                name, number = "", self.lhs
+            if not number:
+                self.caller.msg("|wSTATS>|n Usage: sheet/diff [<target>=]<number>")
+                return
+
         # check to see if caller
         tar = self.caller
-        if self.lhs.lower() == "me" or not self.lhs:
+        if name.lower() == "me" or not name:
             tar = self.caller
         else:
-            tar = self.caller.search(self.args, global_search=True)
+            tar = self.caller.search(name, global_search=True)
 
         try:
             # player has to ahve a splat set first!
@@ -421,15 +508,76 @@ class CmdSheet(Command):
             self.caller.msg("|wCG>|n You can only view your own sheet.")
             return
 
+        if "history" in self.switches:
+            self.show_history(tar)
+            return
+        if "diff" in self.switches:
+            self.show_diff(tar, number.strip())
+            return
+
         # show the sheet
-        self.caller.msg(self.show_bio(tar))
-        self.caller.msg(self.show_attributes(tar))
-        self.caller.msg(self.show_skills(tar))
-        self.caller.msg(self.show_advantages(tar))
+        sections = ["bio", "attributes", "skills", "advantages"]
         if tar.db.stats["bio"].get("splat") == "vampire":
-            self.caller.msg(self.show_disciplines(tar))
+            sections.append("disciplines")
+
+        # build the whole sheet and send it as a single message.
+        output = [str(self.render_header(tar))]
+        for section in sections:
+            text = self.render_section(tar, section)
+            if text:
+                output.append(text)
+        output.append("|R" + "=" * SHEET_WIDTH + "|n")
+
+        self.caller.msg("\n".join(output))
+
+
+class CmdPowers(Command):
+    """
+    This command lists the discipline powers a character can take, given
+    their disciplines and the powers they already have.  Staff can check
+    any character, players only themselves.
+
+    Usage:
+        powers/available [<target>]
+
+    See also: sheet, stats
+    """
+
+    key = "powers"
+    aliases = ["+powers"]
+    locks = "cmd:all()"
+    help_category = "character"
 
-        self.caller.msg(ANSIString(ANSIString("|R=|n") * 78))
+    def func(self):
+        tar = self.caller
+        if self.args and self.args.lower() != "me":
+            tar = self.caller.search(self.args, global_search=True)
+            if not tar:
+                return
+
+        if self.caller != tar and not self.caller.locks.check_lockstring(
+            self.caller, "perm(Builder)"
+        ):
+            self.caller.msg("|wPOWERS>|n You can only check your own powers.")
+            return
+
+        if not tar.db.stats:
+            self.caller.msg("|wPOWERS>|n They don't have a sheet.")
+            return
+
+        available = available_powers(tar.db.stats)
+        output = [str(ANSIString("|w Available Powers |n").center(
+            SHEET_WIDTH, ANSIString("|R=|n")))]
+        for discipline, powers in available.items():
+            output.append(" |w%s|n: %s" % (
+                discipline.title(),
+                ", ".join("%s (%s)" % (x.name, x.level) for x in powers),
+            ))
+        if not available:
+            output.append(" No powers are available.")
+        output.append("|R" + "=" * SHEET_WIDTH + "|n")
+
+        self.caller.msg("\n".join(output))
 
 
 class CmdDice(Command):
@@ -439,11 +587,29 @@ class CmdDice(Command):
     Usage:
         roll <dice pool>
         roll/perm <dice pool>
+        roll/job <id> <dice pool>
+        roll/replay <seed>=<dice>[/<hunger>...]
+        roll/odds <dice pool>[=<difficulty>]
+        roll/bulk <label>=<dice pool>[/<hunger>][; <label>=<dice pool>...]
 
         The first form of this command rolls a dice pool, which is a combination of
         sheet traits plus numbers.  It takes temp scores into account.  The seccond
         form of this command only works with your permentant values in your traits.
 
+        roll/odds shows the exact chance of success, critical, messy
+        critical and bestial failure for a pool, with your current hunger,
+        without rolling it.
+
+        roll/bulk rolls several labelled pools at once, such as a group of
+        NPCs, and shows them to the room as one message.  Add /<hunger> to a
+        pool to roll some of it as hunger dice.
+
+            roll/bulk Ghoul 1=6; Ghoul 2=6; Ventrue=dex + melee/2
+
+        Rolls made to a job, and bulk rolls, show their seed.  Staff can use
+        roll/replay with that seed and the dice after it to roll the exact
+        same dice again.
+
     Example:
         roll str + brawl  + 2
         roll 5
@@ -460,45 +626,179 @@ class CmdDice(Command):
     locks = "cmd:all()"
     help_category = "roleplaying"
 
-    def results(self, dice):
-        output = []
-        res = {}
-        count = 0
-        tens = 0
-        ones = 0
-        crits = 0
-
-        for _ in range(0, int(dice)):
-            roll = random.randint(1, 10)
-            if roll == 10:
-                tens += 1
-                count += 1
-                output.append("|g%s|n " % roll)
-            elif roll >= 6:
-                output.append("|g%s|n " % roll)
-                count += 1
-            elif roll == 1:
-                output.append("|r%s|n " % roll)
-                ones += 1
-            else:
-                output.append("|y%s|n " % roll)
+    def split_hunger(self, dice_pool, hunger):
+        """
+        Split a pool into (regular dice, hunger dice).  Hunger dice replace
+        regular ones, and a pool smaller than hunger is all hunger dice.
+        """
+        dice_pool = max(dice_pool, 0)
+        hunger = min(hunger, dice_pool)
+        return dice_pool - hunger, hunger
+
+    def outcome(self, regular_dice, hunger_dice):
+        """
+        Describe the result of a roll from the regular and hunger dice.
+        """
+        # calculate overall crits from regular and tens.
+        crits = regular_dice.get("tens") + hunger_dice.get("tens")
+        crits = int(crits / 2) * 2
+
+        succs = regular_dice.get("count") + hunger_dice.get("count") + crits
+        if succs == 0 and hunger_dice.get("ones") > 0:
+            return "|rBestial Failure!|n"
+
+        elif succs == 0 and not hunger_dice.get("ones"):
+            return "|yFailure!|n"
+
+        elif succs > 0 and hunger_dice.get("ones") > 0:
+            return "|g" + str(succs) + "|n" + " successes"
+
+        elif crits and hunger_dice.get("tens"):
+            return "|g" + str(succs) + "|n" + " |rMessy Critical!|n"
+        else:
+            return "|g" + str(succs) + "|n" + " successes"
+
+    def bulk_roll(self):
+        """
+        Roll several labelled pools at once, e.g. for a group of NPCs.  All
+        of them come from one draw and the room gets a single message.
+        """
+        entries = [x.strip() for x in self.args.split(";") if x.strip()]
+        if not entries or len(entries) > MAX_BULK_POOLS:
+            self.caller.msg(
+                "Usage: roll/bulk <label>=<dice pool>[/<hunger>][; <label>=<dice pool>...]")
+            self.caller.msg("|wROLL>|n Up to %s pools can be rolled at once." % MAX_BULK_POOLS)
+            return
+
+        stats = self.caller.db.stats or {}
+        rolls = []
+        for entry in entries:
+            try:
+                label, roll = [x.strip() for x in entry.split("=", 1)]
+            except ValueError:
+                self.caller.msg("|wROLL>|n Every pool needs a label: |w%s|n" % entry)
+                return
+
+            hunger = 0
+            if "/" in roll:
+                roll, hunger = roll.rsplit("/", 1)
+                try:
+                    hunger = int(hunger)
+                except ValueError:
+                    self.caller.msg("|wROLL>|n Hunger must be a number: |w%s|n" % entry)
+                    return
+
+            pool = compile_pool(roll)
+            if self.report_unresolved(pool):
+                return
+            dice_pool = evaluate_pool(pool, stats, perm="perm" in self.switches)
+            rolls.append((label, pool, self.split_hunger(dice_pool, hunger)))
+
+        sizes = [size for _, _, pools in rolls for size in pools]
+        seed, results = get_roller(self.caller).roll(*sizes)
+
+        lines = []
+        for i, (label, pool, pools) in enumerate(rolls):
+            regular_dice, hunger_dice = results[2 * i], results[2 * i + 1]
+            line = f"  |w{label}|n: {pool_label(pool)} -> {self.outcome(regular_dice, hunger_dice)} ({regular_dice.get('s_list').strip()})"
+            if pools[1]:
+                line += f" |w<|n{hunger_dice.get('s_list').strip()}|w>|n"
+            lines.append(line)
+        body = "\n".join(lines)
+        tag = f"|x[seed {seed}={'/'.join(str(x) for x in sizes)}]|n"
+
+        for looker in self.caller.location.contents:
+            looker.msg(
+                f"|wROLL>|n |c{self.caller.get_display_name(looker)}|n rolls {len(rolls)} pools: {tag}\n{body}")
+
+    def report_unresolved(self, pool):
+        """
+        Tell the caller about any terms of pool that matched more than one
+        trait, or none.  Returns True if there were any.
+        """
+        for arg, candidates in pool.ambiguous:
+            self.caller.msg(
+                "|wROLL>|n |w%s|n is ambiguous.  Did you mean: |w%s|n?"
+                % (arg, ", ".join(x.trait for x in candidates))
+            )
+        for arg in pool.unknown:
+            self.caller.msg("|wROLL>|n |w%s|n is not a trait." % arg)
+        return bool(pool.ambiguous or pool.unknown)
+
+    def show_odds(self):
+        """
+        Show the odds of a pool for the caller without rolling it.
+        """
+        if not self.lhs:
+            self.caller.msg("Usage: roll/odds <dice pool>[=<difficulty>]")
+            return
 
-        if (tens / 2) >= 1:
-            crits = int((tens / 2) * 2)
+        try:
+            difficulty = int(self.rhs or 1)
+        except ValueError:
+            self.caller.msg("|wODDS>|n Difficulty must be a number.")
+            return
+
+        pool = compile_pool(self.lhs)
+        if self.report_unresolved(pool):
+            return
 
-        output.sort(key=lambda x: int(ANSIString((x))))
-        s_list = "".join(output)
+        stats = self.caller.db.stats or {}
+        dice = max(evaluate_pool(pool, stats, perm="perm" in self.switches), 0)
+        if dice > MAX_POOL:
+            self.caller.msg(
+                f"|wODDS>|n Odds are only worked out for pools of up to {MAX_POOL} dice.")
+            return
+        hunger = min((stats.get("pools") or {}).get("hunger") or 0, dice)
+        difficulty = max(difficulty, 1)
+        odds = pool_odds(dice, hunger, difficulty)
+
+        self.caller.msg(
+            f"|wODDS>|n |w{pool_label(pool)}|n ({dice} dice, {hunger} hunger) "
+            f"vs {difficulty}: |g{odds['win']:.1%}|n success, {odds['critical']:.1%} critical, "
+            f"|r{odds['messy']:.1%}|n messy critical, |r{odds['bestial']:.1%}|n bestial failure.  "
+            f"Average |w{odds['expected']:.1f}|n successes."
+        )
+
+    def replay_roll(self):
+        """
+        Roll a logged seed again so staff can check a disputed result.
+        """
+        if not self.caller.locks.check_lockstring(self.caller, "perm(Builder)"):
+            self.caller.msg("|wROLL>|n Permission denied.")
+            return
 
-        res["output"] = output
-        res["s_list"] = s_list
-        res["count"] = count
-        res["crits"] = crits
-        res["tens"] = tens
-        res["ones"] = ones
+        try:
+            seed = int(self.lhs)
+            pools = [int(x) for x in self.rhs.split("/")]
+        except (AttributeError, ValueError):
+            self.caller.msg("Usage: roll/replay <seed>=<dice>[/<hunger>...]")
+            return
 
-        return res
+        # pools come in pairs of regular and hunger dice, one pair for each
+        # pool of a roll/bulk.
+        results = replay(seed, *pools)
+        shown = []
+        for i in range(0, len(results), 2):
+            part = f"({results[i].get('s_list').strip()})"
+            if i + 1 < len(results) and pools[i + 1]:
+                part += f" |w<|n{results[i + 1].get('s_list').strip()}|w>|n"
+            shown.append(part)
+        self.caller.msg(f"|wROLL>|n Seed |w{seed}|n -> {'; '.join(shown)}")
 
     def func(self):
+        if "replay" in self.switches:
+            self.replay_roll()
+            return
+
+        if "odds" in self.switches:
+            self.show_odds()
+            return
+
+        if "bulk" in self.switches:
+            self.bulk_roll()
+            return
+
         if not self.caller.db.stats:
             self.caller.msg("You don't have any stats yet.")
             return
@@ -508,8 +808,6 @@ class CmdDice(Command):
         except KeyError:
             hunger = 0
 
-        ones = 0
-        crits = 0
         if not self.args:
             self.caller.msg("Usage: roll <dice pool>")
             return
@@ -523,125 +821,27 @@ class CmdDice(Command):
         else:
             roll = self.args
 
-        # Anywhere in the string, when there's a plus sign with a space on each side, replace it with a plus
-        # This is to allow for people to type in "+1 +2 +3" or "+1+2+3" and have it work the same way.
-        args = (
-            roll.replace("+", " +")
-            .replace(" + ", " +")
-            .replace("-", " -")
-            .replace(" - ", " -")
-            .replace("  ", " ")
-            .split(" ")
-        )
-        dice = []
-        dice_pool = 0
-
-        for arg in args:
-            if arg[0] == "+" or arg[0] == "-":
-                if arg[1:].isdigit():
-                    if arg[0] == "+":
-                        dice_pool += int(arg[1:])
-                    else:
-                        dice_pool -= int(arg[1:])
-                    dice.append(arg)
-
-                # everything after the first character is a trait
-                temp_arg = arg[1:]
-                res = get_trait_list(temp_arg)
-                if res:
-                    # Try to add their dice in the trait to the dice pool
-                    try:
-                        value = self.caller.db.stats[res.get("category")][
-                            res.get("trait")
-                        ]
-
-                        # if there's a temp value, add it to the dice pool
-                        try:
-                            temp = self.caller.db.stats["temp"][res.get(
-                                "trait")]
-                        except KeyError:
-                            temp = 0
-                        if "perm" in self.switches:
-                            dice_pool += value
-                        else:
-                            dice_pool += max(value, temp)
-                        # Append the dice list with the actual name of the trait.
-                        dice.append(arg[0] + res.get("trait"))
-                    except KeyError:
-                        # if tehre's no dice behind it, still add the trait to the output.
-                        dice.append(arg[0] + res.get("trait"))
-
-                else:
-                    pass
-            else:
-                if arg.isdigit():
-                    dice_pool += int(arg)
-                    dice.append(arg)
-                else:
-                    res = get_trait_list(arg)
-                    if res:
-                        # Try to add their dice in the trait to the dice pool
-                        try:
-                            value = self.caller.db.stats[res.get("category")][
-                                res.get("trait")
-                            ]
-
-                            # if there's a temp value, add it to the dice pool
-                            temp = 0
-                            try:
-                                temp = (
-                                    self.caller.db.stats["temp"].get(
-                                        res.get("trait"))
-                                    or 0
-                                )
-                            except KeyError:
-                                temp = 0
-
-                            if "perm" in self.switches:
-                                dice_pool += value
-                            else:
-                                try:
-                                    dice_pool += max(value, temp)
-                                except TypeError:
-                                    dice_pool += value
-
-                            # Append the dice list with the actual name of the trait.
-                            dice.append(res.get("trait"))
-                        except KeyError:
-                            # if tehre's no dice behind it, still add the trait to the output.
-                            dice.append(res.get("trait"))
-
-        mod_dice_pool = dice_pool - hunger
-        if mod_dice_pool <= 0:
-            hunger = hunger + mod_dice_pool
-
-        regular_dice = self.results(mod_dice_pool)
-        hunger_dice = self.results(hunger)
-        # calculate overall crits from regular and tens.
-        crits = regular_dice.get("tens") + hunger_dice.get("tens")
-        crits = int(crits / 2) * 2
-
-        succs = regular_dice.get("count") + hunger_dice.get("count") + crits
-        if succs == 0 and hunger_dice.get("ones") > 0:
-            successes = "|rBestial Failure!|n"
+        pool = compile_pool(roll)
 
-        elif succs == 0 and not hunger_dice.get("ones"):
-            successes = "|yFailure!|n"
+        # don't guess which trait was meant, ask instead.
+        if self.report_unresolved(pool):
+            return
 
-        elif succs > 0 and hunger_dice.get("ones") > 0:
-            successes = "|g" + str(succs) + "|n" + " successes"
+        dice_pool = evaluate_pool(
+            pool, self.caller.db.stats, perm="perm" in self.switches)
 
-        elif crits and hunger_dice.get("tens"):
-            successes = "|g" + str(succs) + "|n" + " |rMessy Critical!|n"
-        else:
-            successes = "|g" + str(succs) + "|n" + " successes"
-        dice = " ".join(dice).replace(" +", " + ").replace(" -", " - ")
+        pools = self.split_hunger(dice_pool, hunger)
+        hunger = pools[1]
+        seed, (regular_dice, hunger_dice) = get_roller(self.caller).roll(*pools)
+        successes = self.outcome(regular_dice, hunger_dice)
+        dice = pool_label(pool)
 
         if "job" in self.switches:
             if hunger:
                 msg = f"|wROLL>|n |c{self.caller.get_display_name()}|n rolls |w{dice}|n -> {successes} ({ regular_dice.get('s_list').strip()}) |w<|n{hunger_dice.get('s_list').strip()}|w>|n"
             else:
                 msg = f"|wROLL>|n |c{self.caller.get_display_name()}|n rolls |w{ dice}|n -> {successes} ({regular_dice.get('s_list').strip()})"
+            msg += f" |x[seed {seed}={pools[0]}/{pools[1]}]|n"
             CmdJob.job_comment(self, job, msg, public=True)
 
         else:
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class JobsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "jobs"
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from jobs.models import Job, job_deleted
+        from jobs.search import connect_signals
+
+        post_delete.connect(job_deleted, sender=Job, dispatch_uid="jobs_counters")
+        connect_signals()
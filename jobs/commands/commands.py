@@ -3,15 +3,74 @@ from evennia.objects.models import ObjectDB
 from evennia.accounts.models import AccountDB
 from evennia.utils import class_from_module
 from evennia.utils.ansi import ANSIString
-from evennia.contrib.game_systems.mail import CmdMail
-from jobs.models import Job, Comment
+from jobs.models import Job, Comment, JobEvent
+from jobs.events import bucket_stats, record
+from jobs.mailqueue import queue_comment
+from jobs.notify import JOB_NOTIFIER
+from jobs.search import search
 from evennia.utils.utils import lazy_property
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import datetime, timedelta
+import re
 
 HELP_CATEGORY = "jobs"
 
 COMMAND_DEFAULT_CLASS = class_from_module(settings.COMMAND_DEFAULT_CLASS)
 
+# how many jobs a page of job/list shows.
+JOBS_PER_PAGE = 20
+
+# how many of the latest comments job/view shows without /all.
+COMMENTS_SHOWN = 10
+
+# how many days job/stats covers by default.
+STATS_DAYS = 30
+
+JOB_FILTERS = (
+    "bucket", "status", "assignee", "priority", "tag", "since", "until", "after")
+
+
+def parse_job_filters(text):
+    """
+    Parse job/list filters, e.g. "bucket=cgen status=closed", into a dict.
+    Raises ValueError with a message for the caller.
+    """
+    filters = {}
+    for part in re.split(r"[\s,]+", text.strip()):
+        if not part:
+            continue
+        name, sep, value = part.partition("=")
+        name = name.lower()
+        if not sep or not value or name not in JOB_FILTERS:
+            raise ValueError(
+                f"Filters are <filter>=<value>, where filter is one of: "
+                f"{', '.join(JOB_FILTERS)}.")
+        filters[name] = value.lower()
+    return filters
+
+
+def format_duration(seconds):
+    """Return e.g. 3d 4h for a number of seconds, or - for None."""
+    if seconds is None:
+        return "-"
+    minutes, hours, days = (
+        int(seconds // 60 % 60), int(seconds // 3600 % 24), int(seconds // 86400))
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+
+def parse_date(value):
+    """Return the start of value, a YYYY-MM-DD date."""
+    try:
+        return timezone.make_aware(datetime.strptime(value, "%Y-%m-%d"))
+    except ValueError:
+        raise ValueError(f"{value} is not a date.  Dates are YYYY-MM-DD.")
+
 
 class CmdBucket(COMMAND_DEFAULT_CLASS):
     """
@@ -23,6 +82,10 @@ class CmdBucket(COMMAND_DEFAULT_CLASS):
         bucket/view <name>
         bucket/delete <name>
         bucket/list
+        bucket/check
+
+    Buckets keep counts of their open, closed and unassigned jobs.
+    bucket/check recounts them from the jobs and fixes any that are wrong.
     """
     pass
     key = "bucket"
@@ -70,20 +133,54 @@ class CmdBucket(COMMAND_DEFAULT_CLASS):
             self.list_buckets()
             return
 
+        elif "check" in self.switches:
+            self.check_buckets()
+
+    def check_buckets(self):
+        """
+        Recount every bucket's jobs and fix the counters that are wrong.
+        """
+        counted = Bucket.objects.counted()
+        fixed = []
+        with transaction.atomic():
+            for bucket in Bucket.objects.select_for_update().filter(
+                    id__in=counted):
+                counts = counted[bucket.id]
+                wrong = [
+                    name for name, value in counts.items()
+                    if getattr(bucket, name) != value
+                ]
+                if not wrong:
+                    continue
+                for name in wrong:
+                    setattr(bucket, name, counts[name])
+                bucket.save(update_fields=wrong)
+                fixed.append(bucket.name.upper())
+
+        if fixed:
+            self.caller.msg(
+                f"|wJOBS>|n Fixed the job counts of: {', '.join(fixed)}.")
+        else:
+            self.caller.msg("|wJOBS>|n Every bucket's job counts are right.")
+
     def view_bucket(self):
         """
         View a bucket.
         """
         name = self.args.strip()
         try:
-            bucket = Bucket.objects.get(name=name)
+            bucket = Bucket.objects.select_related(
+                "created_by").with_overdue_counts().get(name=name)
 
             output = ANSIString(f" {bucket.name.upper()} ").center(
                 78, ANSIString("|R=|n")) + "\n"
             output += f" Created by: {bucket.created_by.get_display_name(self.caller)}\n"
             output += f" Created at: {bucket.created_at}\n"
             output += f" Description: {bucket.description}\n"
-            output += f" Jobs: {bucket.jobs.count()}\n"
+            output += (
+                f" Jobs: {bucket.open_jobs} open ({bucket.unassigned_jobs} "
+                f"unassigned, {bucket.overdue_jobs} overdue), "
+                f"{bucket.closed_jobs} closed\n")
             output += f" Archived: {bucket.is_archived}\n"
             output += ANSIString("|R=|n" * 78) + "\n"
 
@@ -96,20 +193,24 @@ class CmdBucket(COMMAND_DEFAULT_CLASS):
         """
         List all buckets.
         """
-        buckets = Bucket.objects.all()
+        buckets = Bucket.objects.with_overdue_counts().order_by("id")
         if not buckets:
             self.caller.msg("|wJOBS>|n No buckets exist.")
             return
        # -------------------------------------------------------------------------------
-       #  ID    Name                DESCRIPTION                                    Jobs
+       #  ID    Name        DESCRIPTION                   Open Unassigned Overdue Closed
         output = ANSIString(" Buckets ").center(78, ANSIString("|R=|n")) + "\n"
         output += ANSIString(
-            " |CID    Name                DESCRIPTION                                   Jobs|n ") + "\n"
+            f" |C{'ID':<6}{'Name':<12}{'DESCRIPTION':<26}{'Open':>6}"
+            f"{'Unassigned':>11}{'Overdue':>8}{'Closed':>8}|n") + "\n"
         output += ANSIString("|R-|n" * 78) + "\n"
 
         for bucket in buckets:
             output += ANSIString(
-                f" #{bucket.id:<5}{bucket.name.upper():<17}   {bucket.description:<41}     {bucket.jobs.count():>4}") + "\n"
+                f" #{bucket.id:<5}{bucket.name.upper()[:11]:<12}"
+                f"{bucket.description[:25]:<26}{bucket.open_jobs:>6}"
+                f"{bucket.unassigned_jobs:>11}{bucket.overdue_jobs:>8}"
+                f"{bucket.closed_jobs:>8}") + "\n"
 
         output += ANSIString("|R-|n" * 78) + "\n"
         output += "Type +bucket/view <name> to view a bucket.\n"
@@ -121,13 +222,18 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
     Manage jobs
 
     Usage:
+        job
+        job/all
+        job/list [<filter>=<value> ...]
+        job/search <words>
+        job/stats [<bucket>][=<days>]
         job <id>
         job/create <bucket>/<title>=<description>
         job/add <id>=<comment>
         job/public <id>=<comment>
         job/addplayer <id>=<account>
         job/removeplayer <id>=<account>
-        job/view <id>
+        job/view <id>[/all]
         job/update <id>=<new description>
         job/add <id>=<comment>
         job/delete <id>
@@ -135,6 +241,24 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
         job/complete <id>
         job/reopen <id>
         job/assign <id>=<account>
+
+    job on its own lists the open jobs, job/all lists closed ones too.
+    job/list filters the list by any of:
+
+        bucket=<name>  status=open|closed|all  assignee=<account>|me|none
+        priority=low|medium|high  tag=<name>  since=<YYYY-MM-DD>
+        until=<YYYY-MM-DD>
+
+    Lists show 20 jobs at a time, and end with the command for the next page.
+    job/search finds the jobs whose title, description or comments have
+    every word, best matches first.
+
+    job/stats reports, for each bucket over the last 30 days (or <days>),
+    the jobs created, closed, reopened and closed after their deadline, how
+    many are open now, and the median time to claim and to close.
+
+    Viewing a job shows its latest 10 comments, add /all to the id for every
+    comment.
     """
 
     key = "jobs"
@@ -154,6 +278,23 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
         if "create" in self.switches:
             self.create_job()
 
+        elif "all" in self.switches:
+            self.list_jobs({"status": "all"})
+
+        elif "search" in self.switches:
+            self.search_jobs()
+
+        elif "stats" in self.switches:
+            self.job_stats()
+
+        elif "list" in self.switches:
+            try:
+                filters = parse_job_filters(self.args)
+            except ValueError as error:
+                self.caller.msg(f"|wJOBS>|n {error}")
+                return
+            self.list_jobs(filters)
+
         elif "addplayer" in self.switches:
             self.job_addplayer()
 
@@ -212,6 +353,7 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
                 assignee = AccountDB.objects.get(username=assignee_name)
                 job.assigned_to = assignee
                 job.save()
+                record(job, JobEvent.ASSIGNED, self.account)
                 self.caller.msg(
                     f"|wJOBS>|n Assigned job {job.id}: {job.title} to {assignee.username}")
             except Job.DoesNotExist:
@@ -230,6 +372,7 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
                 else:
                     job.assigned_to = self.caller
                     job.save()
+                    record(job, JobEvent.CLAIMED, self.account)
                     self.caller.msg(
                         f"|wJOBS>|n You have claimed job {job.id}: {job.title}")
             except Job.DoesNotExist:
@@ -244,7 +387,9 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
                         f"|wJOBS>|n Job {id} is already completed.")
                 else:
                     job.status = 'CLOSED'
+                    job.resolved_at = timezone.now()
                     job.save()
+                    record(job, JobEvent.CLOSED, self.account)
                     self.caller.msg(
                         f"|wJOBS>|n You have completed job {job.id}: {job.title}")
             except Job.DoesNotExist:
@@ -259,7 +404,9 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
                         f"|wJOBS>|n Job {id} is not completed yet.")
                 else:
                     job.status = 'OPEN'
+                    job.resolved_at = None
                     job.save()
+                    record(job, JobEvent.REOPENED, self.account)
                     self.caller.msg(
                         f"|wJOBS>|n You have reopened job {job.id}: {job.title}")
             except Job.DoesNotExist:
@@ -294,11 +441,18 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
 
     def view_job(self):
         """
-        View a specific job.
+        View a specific job, with its latest comments or, for <id>/all,
+        every comment.
         """
-        id = self.args.strip()
+        id, _, show = self.args.strip().partition("/")
+        id = id.strip()
         try:
-            job = Job.objects.get(id=id)
+            job = Job.objects.for_view().get(id=id)
+            comments = job.comments.select_related("author")
+            if show.strip().lower() == "all":
+                comments = list(comments.order_by("id"))
+            else:
+                comments = list(comments.order_by("-id")[:COMMENTS_SHOWN])[::-1]
             # -------------------------------------------------------------------------------
             # Job title: <title>                    ID: <id>
             # Bucket: <bucket>                      Status: <status>
@@ -318,13 +472,17 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
             output += ANSIString("||R-|n" * 78) + "\n"
             output += job.description + "\n\n"
 
-            for comment in job.comments.all():
+            if job.comment_count > len(comments):
+                output += (
+                    f" |x{job.comment_count - len(comments)} earlier comment(s), "
+                    f"use |wjob/view {job.id}/all|x to see them.|n\n\n")
+            for comment in comments:
                 output += ANSIString(
                     f" {comment.author.get_display_name(self.caller)} |Y[{comment.created_at.strftime('%m/%d/%Y')}]|n: {comment.content}") + "\n\n"
             output += ANSIString("||R=|n" * 78) + "\n"
             self.caller.msg(output)
 
-        except (Job.DoesNotExist):
+        except (Job.DoesNotExist, ValueError):
             self.caller.msg(f"|wJOBS>|n No job with ID {id} exists.")
 
     def create_job(self, bucket_title="", title="", description="", created_by=None):
@@ -358,24 +516,75 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
             created_by=account,
             creator=account
         )
-        for acct in AccountDB.objects.all():
-            if self.caller.check_permstring("builders"):
-                acct.msg(
-                    f"|wJOBS>|n New job |w#{job.id}|n created by {account.name}: {job.title}")
-                acct.msg(
-                    f"|wJOBS>|n Use |wjob/view {job.id}|n to view the job.")
-
-    def list_jobs(self):
+        record(job, JobEvent.CREATED, account)
+        JOB_NOTIFIER.new_job(job, account)
+
+    def filter_jobs(self, filters):
+        """
+        Return the jobs matching filters, from parse_job_filters.  Raises
+        ValueError with a message for the caller.
+        """
+        status = filters.get("status", "open")
+        if status == "all":
+            jobs = Job.objects.all()
+        elif status.upper() in dict(Job.STATUS_CHOICES):
+            jobs = Job.objects.filter(status=status.upper())
+        else:
+            raise ValueError("Status is open, closed or all.")
+
+        if "bucket" in filters:
+            jobs = jobs.filter(bucket__name=filters["bucket"])
+
+        assignee = filters.get("assignee")
+        if assignee == "none":
+            jobs = jobs.filter(assigned_to__isnull=True)
+        elif assignee == "me":
+            jobs = jobs.filter(assigned_to=self.account)
+        elif assignee:
+            try:
+                jobs = jobs.filter(
+                    assigned_to=AccountDB.objects.get(username__iexact=assignee))
+            except AccountDB.DoesNotExist:
+                raise ValueError(f"No account with username {assignee} exists.")
+
+        if "priority" in filters:
+            priority = filters["priority"].upper()
+            if priority not in dict(Job.PRIORITY_CHOICES):
+                raise ValueError("Priority is low, medium or high.")
+            jobs = jobs.filter(priority=priority)
+
+        if "tag" in filters:
+            jobs = jobs.filter(tags__name__iexact=filters["tag"]).distinct()
+
+        if "since" in filters:
+            jobs = jobs.filter(created_at__gte=parse_date(filters["since"]))
+        if "until" in filters:
+            jobs = jobs.filter(
+                created_at__lt=parse_date(filters["until"]) + timedelta(days=1))
+
+        return jobs.for_list()
+
+    def list_jobs(self, filters=None):
         """
-        List all jobs.
+        List a page of the jobs matching filters, by default the open ones.
         """
         # -------------------------------------------------------------------------------
         #  ID    title                       Bucket      Assigned to              Status
         # -------------------------------------------------------------------------------
-        jobs = Job.objects.all()
+        filters = filters or {}
+        after = filters.get("after", "0")
+        if not after.isdigit():
+            self.caller.msg("|wJOBS>|n After is a job id.")
+            return
+
+        try:
+            jobs, more = self.filter_jobs(filters).page(int(after), JOBS_PER_PAGE)
+        except ValueError as error:
+            self.caller.msg(f"|wJOBS>|n {error}")
+            return
 
         if not jobs:
-            self.caller.msg("|wJOBS>|n There are no jobs.")
+            self.caller.msg("|wJOBS>|n There are no jobs to list.")
             return
 
         output = ANSIString(" |wJOBS|n ").center(
@@ -393,9 +602,68 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
             output += f" #{job.id:<4} {job.title:<25}   {job.bucket.name.upper():<10}  {assigned_to:<20} {job.status:>10}\n"
 
         output += ANSIString("||R=|n" * 78) + "\n"
+        if more:
+            args = [
+                f"{name}={value}" for name, value in filters.items()
+                if name != "after"
+            ] + [f"after={jobs[-1].id}"]
+            output += f"Type |wjob/list {' '.join(args)}|n for more.\n"
         output += "Type |wjob/view <id>|n to view a job."
         self.caller.msg(output)
 
+    def search_jobs(self):
+        """
+        Search the text of jobs and their comments.
+        """
+        if not self.args.strip():
+            self.caller.msg("|wJOBS>|n Usage: job/search <words>")
+            return
+
+        results = search(self.args)
+        if not results:
+            self.caller.msg(f"|wJOBS>|n No jobs match |w{self.args.strip()}|n.")
+            return
+
+        output = ANSIString(" |wJOB SEARCH|n ").center(
+            78, ANSIString("|R=|n")) + "\n"
+        for job, snippet in results:
+            output += f" |w#{job.id:<4}|n {job.title:<40} {job.bucket.name.upper():<10} {job.status:>10}\n"
+            output += f"       {snippet}\n"
+        output += ANSIString("||R=|n" * 78) + "\n"
+        output += "Type |wjob/view <id>|n to view a job."
+        self.caller.msg(output)
+
+    def job_stats(self):
+        """
+        Report the bucket metrics for the last few days.
+        """
+        bucket = self.lhs.strip().lower()
+        days = self.rhs.strip() if self.rhs else str(STATS_DAYS)
+        if not days.isdigit() or not int(days):
+            self.caller.msg("|wJOBS>|n Usage: job/stats [<bucket>][=<days>]")
+            return
+
+        since = timezone.localdate() - timedelta(days=int(days) - 1)
+        stats = bucket_stats(since, bucket)
+        if not stats:
+            self.caller.msg(f"|wJOBS>|n No job activity in the last {days} days.")
+            return
+
+        output = ANSIString(f" |wJOB STATS: LAST {days} DAYS|n ").center(
+            78, ANSIString("|R=|n")) + "\n"
+        output += ANSIString(
+            f"|C {'Bucket':<10} {'Created':>8} {'Closed':>7} {'Reopened':>9} "
+            f"{'Late':>5} {'Open':>5} {'To claim':>10} {'To close':>10}|n") + "\n"
+        output += ANSIString("||R-|n" * 78) + "\n"
+        for name, row in sorted(stats.items()):
+            output += (
+                f" {name.upper():<10} {row['created']:>8} {row['closed']:>7} "
+                f"{row['reopened']:>9} {row['late']:>5} {row['open']:>5} "
+                f"{format_duration(row['claim']):>10} {format_duration(row['close']):>10}\n"
+            )
+        output += ANSIString("||R=|n" * 78) + "\n"
+        self.caller.msg(output)
+
     def job_addplayer(self):
         """
         Add a player to a job.
@@ -426,18 +694,12 @@ class CmdJob(COMMAND_DEFAULT_CLASS):
             acct = AccountDB.objects.get(id=caller.id)
             comm = Comment.objects.create(
                 job=job, public=public, author=acct, content=note)
+            record(job, JobEvent.COMMENTED, acct)
             self.caller.msg(f"Your comment has been added to job |w#{job.id}|n.")
-            # If the comment is public, notify the job's creator and possibly other players
-            if public:
-                # Notify the job's creator if they are not the one adding the comment
-                if job.created_by != caller:
-                    job.created_by.msg(f"|wJOBS>|n {acct.username} has added a public comment to job |w#{job.id}|n: {note}")
-                
-                # Here you can add logic to notify other players if necessary
-    
-                # Send mail to the job's creator if the comment is public
-                CmdMail.send_mail(self, recipients=[job.created_by], caller=self.caller,
-                                  subject=f"New Public Comment on Job #{job.id}", message=note)
+            # If the comment is public, mail the job's creator.  The mail is
+            # queued and sent with any other comments on the job shortly.
+            if public and job.created_by and job.created_by != acct:
+                queue_comment(job, job.created_by, acct, note)
         except Job.DoesNotExist:
             self.caller.msg(f"|wJOBS>|n No job with ID |w{id}|n exists.")
 
@@ -508,6 +770,7 @@ class CmdMyJobs(COMMAND_DEFAULT_CLASS):
                 creator=account,     # Also assigning the account to 'creator' if needed
                 bucket=bucket
             )
+            record(job, JobEvent.CREATED, account)
             self.caller.msg(f"Job {job.id} created in bucket '{bucket.name}': {title.strip()}")
         except Exception as e:
             self.caller.msg(f"An error occurred while creating the job: {e}")
@@ -543,7 +806,7 @@ class CmdMyJobs(COMMAND_DEFAULT_CLASS):
         output += "|R" + "-" * 78 + "|n\n"  # Dark red '-' characters for divider before Comments
     
         # Comments
-        public_comments = job.comments.filter(public=True)
+        public_comments = job.comments.filter(public=True).select_related("author")
         if public_comments:
             output += "|wComments:|n\n"
             for comment in public_comments:
@@ -561,7 +824,7 @@ class CmdMyJobs(COMMAND_DEFAULT_CLASS):
             self.caller.msg("This command can only be used by authenticated accounts.")
             return
     
-        jobs = self.jobs.all()
+        jobs = self.jobs.select_related("bucket")
         output = ""
         if jobs:
             # Start of frame
@@ -0,0 +1,85 @@
+"""
+The job event log and the bucket metrics built from it.
+
+record adds a JobEvent and, in the same transaction, folds it into the
+BucketMetrics row of the job's bucket for the day.  Reports read the daily
+rows, a few per bucket, however long the history gets.
+
+Times to claim and to close are kept per day as lists of seconds rather
+than averages, so a report over any range of days can take the real
+median.
+"""
+
+from statistics import median
+from django.db import transaction
+from django.utils import timezone
+from jobs.models import Bucket, BucketMetrics, JobEvent
+
+
+def record(job, kind, account=None):
+    """Record that kind, a JobEvent kind, happened to job."""
+    now = timezone.now()
+    with transaction.atomic():
+        first_claim = kind in (JobEvent.CLAIMED, JobEvent.ASSIGNED) and not (
+            job.events.filter(
+                kind__in=(JobEvent.CLAIMED, JobEvent.ASSIGNED)).exists()
+        )
+        event = JobEvent.objects.create(job=job, kind=kind, account=account)
+
+        metrics, _ = BucketMetrics.objects.select_for_update().get_or_create(
+            bucket_id=job.bucket_id, day=timezone.localdate(now))
+        seconds = int((now - job.created_at).total_seconds())
+
+        if kind == JobEvent.CREATED:
+            metrics.created += 1
+        elif first_claim:
+            metrics.claim_seconds.append(seconds)
+        elif kind == JobEvent.CLOSED:
+            metrics.closed += 1
+            metrics.close_seconds.append(seconds)
+            if job.deadline and now > job.deadline:
+                metrics.late += 1
+        elif kind == JobEvent.REOPENED:
+            metrics.reopened += 1
+
+        # the bucket's counter already has this change, from Job.save.
+        metrics.open = Bucket.objects.filter(id=job.bucket_id).values_list(
+            "open_jobs", flat=True).first() or 0
+        metrics.save()
+    return event
+
+
+def bucket_stats(since, bucket=None):
+    """
+    Return {bucket name: stats} for the days from since, a date, until
+    today.  stats is a dict of created, closed, reopened, late, open (as of
+    the latest day) and the median seconds to claim and to close, or None.
+    """
+    rows = BucketMetrics.objects.filter(day__gte=since).select_related(
+        "bucket").order_by("day")
+    if bucket:
+        rows = rows.filter(bucket__name=bucket)
+
+    totals = {}
+    for row in rows:
+        stats = totals.setdefault(row.bucket.name, {
+            "created": 0,
+            "closed": 0,
+            "reopened": 0,
+            "late": 0,
+            "open": 0,
+            "claim": [],
+            "close": [],
+        })
+        stats["created"] += row.created
+        stats["closed"] += row.closed
+        stats["reopened"] += row.reopened
+        stats["late"] += row.late
+        stats["open"] = row.open
+        stats["claim"].extend(row.claim_seconds)
+        stats["close"].extend(row.close_seconds)
+
+    for stats in totals.values():
+        stats["claim"] = median(stats["claim"]) if stats["claim"] else None
+        stats["close"] = median(stats["close"]) if stats["close"] else None
+    return totals
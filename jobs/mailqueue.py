@@ -0,0 +1,122 @@
+"""
+Deferred delivery of the mail and notices job comments send.
+
+Commands queue what should be sent with queue_comment and carry on; the
+JobMailQueue script delivers the queue every MAIL_INTERVAL seconds.  Comments
+on the same job for the same account since the last delivery go out as one
+mail and one notice.  A delivery that fails is tried again on the next run,
+up to MAX_ATTEMPTS times.  Entries are marked mailed as soon as their mail
+exists, so a retry only sends what is still missing and never a second
+copy of the mail.
+
+The queue is kept in the script's attributes, so nothing queued is lost on
+a reload.  Mail is created the way the mail contrib stores it, so it is
+read with the mail command.
+"""
+
+from evennia import create_script, search_script
+from evennia.utils import create, logger
+from typeclasses.scripts import Script
+
+MAIL_QUEUE_KEY = "job_mail_queue"
+
+# seconds between deliveries.
+MAIL_INTERVAL = 5
+
+# how many times a delivery is tried before it is dropped.
+MAX_ATTEMPTS = 5
+
+
+def _name(account):
+    return account.username if account else "Someone"
+
+
+class JobMailQueue(Script):
+    """Delivers the queued job comment mail."""
+
+    def at_script_creation(self):
+        self.key = MAIL_QUEUE_KEY
+        self.desc = "Delivers job comment mail."
+        self.interval = MAIL_INTERVAL
+        self.persistent = True
+        self.db.pending = []
+
+    def add(self, job, recipient, sender, text):
+        self.db.pending.append({
+            "job": job.id,
+            "recipient": recipient,
+            "sender": sender,
+            "text": text,
+            "attempts": 0,
+        })
+
+    def at_repeat(self):
+        if not self.db.pending:
+            return
+        pending = self.db.pending.deserialize()
+        self.db.pending = []
+
+        # one mail per recipient and job.
+        batches = {}
+        for entry in pending:
+            if entry["recipient"] is None:
+                continue  # deleted since.
+            # entries already mailed only need their notice again.
+            key = (entry["recipient"].id, entry["job"], entry.get("mailed", False))
+            batches.setdefault(key, []).append(entry)
+
+        retry = []
+        for entries in batches.values():
+            try:
+                self.deliver(entries)
+            except Exception:
+                logger.log_trace("Job mail delivery failed.")
+                retry.extend(
+                    dict(entry, attempts=entry["attempts"] + 1)
+                    for entry in entries
+                    if entry["attempts"] + 1 < MAX_ATTEMPTS
+                )
+        if retry:
+            self.db.pending.extend(retry)
+
+    def deliver(self, entries):
+        """
+        Send entries, comments on one job for one account, as one mail and
+        one notice.
+        """
+        recipient = entries[0]["recipient"]
+        job = entries[0]["job"]
+        senders = []
+        for entry in entries:
+            if _name(entry["sender"]) not in senders:
+                senders.append(_name(entry["sender"]))
+
+        if len(entries) == 1:
+            subject = f"New Public Comment on Job #{job}"
+        else:
+            subject = f"{len(entries)} New Public Comments on Job #{job}"
+        message = "\n\n".join(
+            f"{_name(entry['sender'])}: {entry['text']}" for entry in entries)
+
+        if not entries[0].get("mailed"):
+            mail = create.create_message(
+                entries[0]["sender"], message, receivers=recipient, header=subject)
+            for entry in entries:
+                entry["mailed"] = True
+            mail.tags.add("new", category="mail")
+        recipient.msg(
+            f"|wJOBS>|n {', '.join(senders)} added {len(entries)} public "
+            f"comment(s) to job |w#{job}|n.  Check your mail to read them.")
+
+
+def mail_queue():
+    """Return the mail queue script, creating it if need be."""
+    found = search_script(MAIL_QUEUE_KEY)
+    if found:
+        return found[0]
+    return create_script(JobMailQueue, key=MAIL_QUEUE_KEY, persistent=True)
+
+
+def queue_comment(job, recipient, sender, text):
+    """Queue a public comment on job to be sent to recipient."""
+    mail_queue().add(job, recipient, sender, text)
@@ -0,0 +1,26 @@
+# Generated by Django 4.1.9 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0005_comment_public"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["status", "bucket", "created_at"],
+                name="job_status_bucket_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["assigned_to", "status"],
+                name="job_assignee_status_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.1.9 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_search_index(apps, schema_editor):
+    from jobs.search import create_fts_table, rebuild_index
+
+    create_fts_table(schema_editor.connection)
+    rebuild_index(
+        apps.get_model("jobs", "Job"),
+        apps.get_model("jobs", "Comment"),
+        apps.get_model("jobs", "SearchToken"),
+        schema_editor.connection,
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    from jobs.search import drop_fts_table
+
+    drop_fts_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0006_job_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(max_length=64)),
+                ("score", models.PositiveIntegerField()),
+                (
+                    "comment",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="jobs.comment",
+                    ),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_tokens",
+                        to="jobs.job",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="searchtoken",
+            index=models.Index(
+                fields=["token", "job"], name="search_token_job_idx"
+            ),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
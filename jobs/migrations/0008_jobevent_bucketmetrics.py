@@ -0,0 +1,102 @@
+# Generated by Django 4.1.9 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("jobs", "0007_searchtoken"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("CREATED", "Created"),
+                            ("CLAIMED", "Claimed"),
+                            ("ASSIGNED", "Assigned"),
+                            ("COMMENTED", "Commented"),
+                            ("CLOSED", "Closed"),
+                            ("REOPENED", "Reopened"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="job_events",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="jobs.job",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="BucketMetrics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("created", models.PositiveIntegerField(default=0)),
+                ("closed", models.PositiveIntegerField(default=0)),
+                ("reopened", models.PositiveIntegerField(default=0)),
+                ("late", models.PositiveIntegerField(default=0)),
+                ("open", models.PositiveIntegerField(default=0)),
+                ("claim_seconds", models.JSONField(default=list)),
+                ("close_seconds", models.JSONField(default=list)),
+                (
+                    "bucket",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="metrics",
+                        to="jobs.bucket",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="jobevent",
+            index=models.Index(fields=["job", "kind"], name="job_event_kind_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="bucketmetrics",
+            constraint=models.UniqueConstraint(
+                fields=("bucket", "day"), name="unique_bucket_metrics_day"
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.1.9 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+def count_jobs(apps, schema_editor):
+    Bucket = apps.get_model("jobs", "Bucket")
+    for bucket in Bucket.objects.all():
+        jobs = bucket.jobs.all()
+        bucket.open_jobs = jobs.filter(status="OPEN").count()
+        bucket.closed_jobs = jobs.filter(status="CLOSED").count()
+        bucket.unassigned_jobs = jobs.filter(
+            status="OPEN", assigned_to__isnull=True
+        ).count()
+        bucket.save(
+            update_fields=["open_jobs", "closed_jobs", "unassigned_jobs"]
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0008_jobevent_bucketmetrics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bucket",
+            name="open_jobs",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="bucket",
+            name="closed_jobs",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="bucket",
+            name="unassigned_jobs",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_jobs, migrations.RunPython.noop),
+    ]
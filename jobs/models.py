@@ -1,8 +1,99 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 # Create your models here.
 from evennia.accounts.models import AccountDB
 
+# the Bucket counters, see Job.save.
+JOB_COUNTERS = ('open_jobs', 'closed_jobs', 'unassigned_jobs')
+
+
+def job_counters(status, assigned_to_id):
+    """Return the Bucket counters a job with status and assignee counts in."""
+    if status == 'CLOSED':
+        return ('closed_jobs',)
+    if assigned_to_id is None:
+        return ('open_jobs', 'unassigned_jobs')
+    return ('open_jobs',)
+
+
+class BucketQuerySet(models.QuerySet):
+    def adjust(self, bucket_id, counters, change):
+        """Add change to counters of bucket, in the database."""
+        self.filter(id=bucket_id).update(
+            **{name: models.F(name) + change for name in counters})
+
+    def with_overdue_counts(self):
+        """
+        Annotate each bucket with overdue_jobs, its open jobs past their
+        deadline.  That changes with the time rather than with the jobs, so
+        it's counted, in the same query, instead of kept.
+        """
+        return self.annotate(overdue_jobs=models.Count(
+            'jobs',
+            filter=models.Q(
+                jobs__status='OPEN', jobs__deadline__lt=timezone.now()),
+        ))
+
+    def counted(self):
+        """
+        Return {bucket id: {counter: value}} counted from the jobs, for
+        checking the counters, in one query.
+        """
+        counts = {
+            bucket_id: dict.fromkeys(JOB_COUNTERS, 0) for bucket_id in
+            self.values_list('id', flat=True)
+        }
+        rows = Job.objects.filter(bucket__in=self).values(
+            'bucket_id', 'status',
+        ).annotate(
+            count=models.Count('id'),
+            unassigned=models.Count(
+                'id', filter=models.Q(assigned_to__isnull=True)),
+        ).order_by()
+        for row in rows:
+            bucket = counts[row['bucket_id']]
+            if row['status'] == 'CLOSED':
+                bucket['closed_jobs'] += row['count']
+            else:
+                bucket['open_jobs'] += row['count']
+                bucket['unassigned_jobs'] += row['unassigned']
+        return counts
+
+
+class JobQuerySet(models.QuerySet):
+    def open(self):
+        return self.filter(status='OPEN')
+
+    def for_list(self):
+        """
+        Fetch everything a job listing shows in one query, instead of one
+        more per job for its bucket and assignee.
+        """
+        return self.select_related('bucket', 'assigned_to').order_by('id')
+
+    def for_view(self):
+        """
+        Fetch a job with everything the job view shows except its comments,
+        which are paged, in two queries.
+        """
+        return self.select_related(
+            'bucket', 'assigned_to', 'created_by',
+        ).prefetch_related('players').annotate(
+            comment_count=models.Count('comments'))
+
+    def page(self, after=None, size=20):
+        """
+        Return (jobs, more): up to size jobs with ids after after, and
+        whether there are more after those.  Paging on the id instead of an
+        offset makes the last page as cheap as the first.
+        """
+        jobs = self.order_by('id')
+        if after:
+            jobs = jobs.filter(id__gt=after)
+        jobs = list(jobs[:size + 1])
+        return jobs[:size], len(jobs) > size
+
 
 class Bucket(models.Model):
     name = models.CharField(max_length=200)
@@ -17,6 +108,13 @@ class Bucket(models.Model):
         null=True,
         related_name='created_buckets',
     )
+    # kept up to date by Job.save and job_deleted, and checked by
+    # bucket/check.
+    open_jobs = models.IntegerField(default=0)
+    closed_jobs = models.IntegerField(default=0)
+    unassigned_jobs = models.IntegerField(default=0)
+
+    objects = BucketQuerySet.as_manager()
 
 
 class Job(models.Model):
@@ -59,6 +157,66 @@ class Job(models.Model):
     players = models.ManyToManyField(
         AccountDB, related_name='related_jobs')
 
+    objects = JobQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        job = super().from_db(db, field_names, values)
+        job._counted = job.counted_in()
+        # the text as loaded, so saving can skip re-indexing it for search.
+        job._indexed_text = (
+            job.__dict__.get('title'), job.__dict__.get('description'))
+        return job
+
+    def counted_in(self):
+        """
+        Return (bucket id, counters) of the Bucket counters this job counts
+        in, or None if those fields weren't loaded.
+        """
+        fields = self.__dict__
+        if not {'bucket_id', 'status', 'assigned_to_id'} <= set(fields):
+            return None
+        return (
+            fields['bucket_id'],
+            job_counters(fields['status'], fields['assigned_to_id']),
+        )
+
+    def save(self, *args, **kwargs):
+        """Save the job and move it between its buckets' counters."""
+        with transaction.atomic():
+            before = None
+            if not self._state.adding:
+                before = getattr(self, '_counted', None)
+                if before is None:
+                    before = Job.objects.get(pk=self.pk).counted_in()
+            super().save(*args, **kwargs)
+
+            after = self.counted_in() or Job.objects.get(pk=self.pk).counted_in()
+            if before != after:
+                if before:
+                    Bucket.objects.adjust(*before, -1)
+                Bucket.objects.adjust(*after, 1)
+            self._counted = after
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'bucket', 'created_at'],
+                name='job_status_bucket_idx',
+            ),
+            models.Index(
+                fields=['assigned_to', 'status'],
+                name='job_assignee_status_idx',
+            ),
+        ]
+
+
+def job_deleted(sender, instance, **kwargs):
+    """Take a deleted job out of its bucket's counters."""
+    counted = getattr(instance, '_counted', None) or instance.counted_in()
+    if counted:
+        Bucket.objects.adjust(*counted, -1)
+
 
 class Comment(models.Model):
     content = models.TextField()
@@ -74,3 +232,92 @@ class Comment(models.Model):
 
 class Tag(models.Model):
     name = models.CharField(max_length=200)
+
+
+class SearchToken(models.Model):
+    """
+    A word of a job's title or description, or of one of its comments, for
+    searching jobs on databases without full-text search.  See jobs.search.
+    """
+    token = models.CharField(max_length=64)
+    job = models.ForeignKey(
+        Job, related_name='search_tokens', on_delete=models.CASCADE)
+    comment = models.ForeignKey(
+        Comment,
+        related_name='search_tokens',
+        on_delete=models.CASCADE,
+        null=True,
+    )
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'job'], name='search_token_job_idx'),
+        ]
+
+
+class JobEvent(models.Model):
+    """
+    Something that happened to a job.  Events are only ever added, see
+    jobs.events.
+    """
+    CREATED = 'CREATED'
+    CLAIMED = 'CLAIMED'
+    ASSIGNED = 'ASSIGNED'
+    COMMENTED = 'COMMENTED'
+    CLOSED = 'CLOSED'
+    REOPENED = 'REOPENED'
+
+    KIND_CHOICES = [
+        (CREATED, 'Created'),
+        (CLAIMED, 'Claimed'),
+        (ASSIGNED, 'Assigned'),
+        (COMMENTED, 'Commented'),
+        (CLOSED, 'Closed'),
+        (REOPENED, 'Reopened'),
+    ]
+
+    job = models.ForeignKey(Job, related_name='events', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    account = models.ForeignKey(
+        AccountDB,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='job_events',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['job', 'kind'], name='job_event_kind_idx'),
+        ]
+
+
+class BucketMetrics(models.Model):
+    """
+    A bucket's job metrics for one day, kept up to date as events are
+    recorded so reports don't have to go through the events.
+    """
+    bucket = models.ForeignKey(
+        Bucket, related_name='metrics', on_delete=models.CASCADE)
+    day = models.DateField()
+    created = models.PositiveIntegerField(default=0)
+    closed = models.PositiveIntegerField(default=0)
+    reopened = models.PositiveIntegerField(default=0)
+    # closed after their deadline.
+    late = models.PositiveIntegerField(default=0)
+    # open jobs in the bucket as of the last event of the day.
+    open = models.PositiveIntegerField(default=0)
+    # seconds from creation to first claim or assignment, and to closing,
+    # of the jobs claimed and closed that day.
+    claim_seconds = models.JSONField(default=list)
+    close_seconds = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bucket', 'day'],
+                name='unique_bucket_metrics_day',
+            ),
+        ]
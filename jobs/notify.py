@@ -0,0 +1,91 @@
+"""
+Tell staff about new jobs.
+
+JOB_NOTIFIER keeps the staff accounts that are connected, so a new job is
+sent to them and nobody else, however many accounts there are.  The login
+and logout hooks of typeclasses.accounts.Account keep it up to date.  It is
+built from the connected sessions the first time it is needed, which also
+covers a server reload.
+
+Staff who are offline get one digest of the open jobs created while they
+were away when they next log in.  The newest job id is recorded on the
+account at logout, so creating a job writes nothing per staff member.
+"""
+
+from evennia.server.sessionhandler import SESSION_HANDLER
+from jobs.models import Job
+
+STAFF_PERMISSION = "Builder"
+
+# the most jobs a login digest lists by name.
+DIGEST_LENGTH = 10
+
+
+def is_staff(account):
+    return account.check_permstring(STAFF_PERMISSION)
+
+
+def latest_job_id():
+    return Job.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+
+class JobNotifier:
+    def __init__(self):
+        self.staff = None  # account id -> account
+
+    def online_staff(self):
+        """Return {id: account} of the connected staff."""
+        if self.staff is None:
+            self.staff = {
+                account.id: account
+                for account in SESSION_HANDLER.all_connected_accounts()
+                if is_staff(account)
+            }
+        return self.staff
+
+    def connected(self, account):
+        """Called when account logs in."""
+        if not is_staff(account):
+            return
+        self.online_staff()[account.id] = account
+        self.send_digest(account)
+
+    def disconnected(self, account):
+        """Called when one of account's sessions disconnects."""
+        staff = self.online_staff()
+        # the session going away is still counted.
+        if account.id not in staff or account.sessions.count() > 1:
+            return
+        del staff[account.id]
+        account.db.jobs_seen = latest_job_id()
+
+    def send_digest(self, account):
+        """Tell account about the open jobs created since they logged out."""
+        seen = account.db.jobs_seen
+        account.db.jobs_seen = latest_job_id()
+        if seen is None:
+            return
+
+        jobs = Job.objects.open().filter(id__gt=seen).order_by("id")
+        count = jobs.count()
+        if not count:
+            return
+
+        lines = [f"|wJOBS>|n {count} new job(s) since you were last on:"]
+        for job in jobs[:DIGEST_LENGTH]:
+            lines.append(f"  |w#{job.id}|n {job.title}")
+        if count > DIGEST_LENGTH:
+            lines.append(f"  ... and {count - DIGEST_LENGTH} more.")
+        lines.append("|wJOBS>|n Use |wjob/list|n to see them.")
+        account.msg("\n".join(lines))
+
+    def new_job(self, job, creator):
+        """Tell the connected staff about job, created by creator."""
+        for account in list(self.online_staff().values()):
+            account.msg(
+                f"|wJOBS>|n New job |w#{job.id}|n created by {creator.name}: "
+                f"{job.title}\n"
+                f"|wJOBS>|n Use |wjob/view {job.id}|n to view the job.")
+
+
+JOB_NOTIFIER = JobNotifier()
@@ -0,0 +1,349 @@
+"""
+Full-text search over jobs and their comments.
+
+On SQLite the text lives in an FTS5 table, FTS_TABLE, with a row for each
+job (its title and description, at rowid -job id) and one for each comment
+(at rowid comment id), so a row can be replaced by its rowid whenever the
+job or comment is saved.  FTS5 ranks the matches with bm25 and cuts the
+snippets.
+
+Other databases, or SQLite built without FTS5, use a token index instead:
+a SearchToken for every distinct word of each job and comment, scored by
+how often the word appears, with words of the title counting TITLE_WEIGHT
+times.  A search is then one grouped query over the tokens.
+
+Both find the jobs that have every word of the search somewhere in their
+title, description or comments.
+
+Either way the index is kept up to date by the signal handlers at the
+bottom, which JobsConfig.ready connects, and rebuild_index builds it from
+scratch.
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count, Sum
+from django.db.models.signals import post_delete, post_save
+from jobs.models import Comment, Job, SearchToken
+
+FTS_TABLE = "jobs_search_fts"
+
+TOKEN_RE = re.compile(r"\w+")
+
+# how much more a word in a job's title counts than one in its text.
+TITLE_WEIGHT = 5
+
+# the most jobs a search returns.
+MAX_RESULTS = 20
+
+# about how many characters of text a snippet shows.
+SNIPPET_WIDTH = 60
+
+HIGHLIGHT = ("|y", "|n")
+
+
+@lru_cache(maxsize=None)
+def _fts_enabled(alias):
+    conn = connections[alias]
+    return (
+        conn.vendor == "sqlite"
+        and FTS_TABLE in conn.introspection.table_names()
+    )
+
+
+def fts_enabled(conn=connection):
+    """Whether conn has the FTS5 table, see create_fts_table."""
+    return _fts_enabled(conn.alias)
+
+
+def create_fts_table(conn=connection):
+    """
+    Create the FTS5 table if conn is SQLite with FTS5.  Returns whether it
+    exists.
+    """
+    if conn.vendor != "sqlite":
+        return False
+    try:
+        with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"job_id UNINDEXED, title, body, "
+                f"tokenize = 'unicode61 remove_diacritics 2')"
+            )
+    except OperationalError:
+        # built without FTS5, the token index is used instead.
+        return False
+    finally:
+        _fts_enabled.cache_clear()
+    return True
+
+
+def drop_fts_table(conn=connection):
+    if conn.vendor == "sqlite":
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    _fts_enabled.cache_clear()
+
+
+def tokens(text):
+    """Return the searchable words of text."""
+    return [
+        token for token in TOKEN_RE.findall(text.lower())
+        if 1 < len(token) <= 64
+    ]
+
+
+def token_scores(title, body):
+    """Return {token: score} for a job or comment."""
+    scores = Counter()
+    for token in tokens(title):
+        scores[token] += TITLE_WEIGHT
+    for token in tokens(body):
+        scores[token] += 1
+    return scores
+
+
+def _job_row(job_id, title, description):
+    return (-job_id, job_id, title, description)
+
+
+def _comment_row(comment_id, job_id, content):
+    return (comment_id, job_id, "", content)
+
+
+def _fts_replace(conn, rowid, row=None):
+    with conn.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [rowid])
+        if row:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, job_id, title, body) "
+                f"VALUES (%s, %s, %s, %s)",
+                row,
+            )
+
+
+def _tokens_replace(SearchToken, job_id, comment_id, title, body):
+    SearchToken.objects.filter(job_id=job_id, comment_id=comment_id).delete()
+    SearchToken.objects.bulk_create(
+        SearchToken(job_id=job_id, comment_id=comment_id, token=token, score=score)
+        for token, score in token_scores(title, body).items()
+    )
+
+
+def index_job(job):
+    """Index job's title and description."""
+    if fts_enabled():
+        _fts_replace(
+            connection, -job.id, _job_row(job.id, job.title, job.description))
+    else:
+        _tokens_replace(SearchToken, job.id, None, job.title, job.description)
+
+
+def index_comment(comment):
+    """Index comment's text."""
+    if fts_enabled():
+        _fts_replace(
+            connection,
+            comment.id,
+            _comment_row(comment.id, comment.job_id, comment.content),
+        )
+    else:
+        _tokens_replace(SearchToken, comment.job_id, comment.id, "", comment.content)
+
+
+def rebuild_index(
+    Job=Job, Comment=Comment, SearchToken=SearchToken, conn=connection
+):
+    """
+    Index every job and comment from scratch.  The models can be given for
+    use from a migration.
+    """
+    jobs = Job.objects.values_list("id", "title", "description")
+    comments = Comment.objects.values_list("id", "job_id", "content")
+
+    if fts_enabled(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            insert = (
+                f"INSERT INTO {FTS_TABLE} (rowid, job_id, title, body) "
+                f"VALUES (%s, %s, %s, %s)"
+            )
+            cursor.executemany(insert, [_job_row(*x) for x in jobs.iterator()])
+            cursor.executemany(
+                insert, [_comment_row(*x) for x in comments.iterator()])
+        return
+
+    SearchToken.objects.all().delete()
+    rows = []
+    for job_id, title, description in jobs.iterator():
+        rows.extend(
+            SearchToken(job_id=job_id, token=token, score=score)
+            for token, score in token_scores(title, description).items()
+        )
+    for comment_id, job_id, content in comments.iterator():
+        rows.extend(
+            SearchToken(
+                job_id=job_id, comment_id=comment_id, token=token, score=score)
+            for token, score in token_scores("", content).items()
+        )
+    SearchToken.objects.bulk_create(rows, batch_size=1000)
+
+
+def make_snippet(text, terms, width=SNIPPET_WIDTH):
+    """Cut the part of text around the first of terms and highlight them."""
+    text = " ".join(text.split())
+    pattern = re.compile(
+        r"\b(%s)\b" % "|".join(re.escape(x) for x in terms), re.IGNORECASE)
+
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    snippet = pattern.sub(
+        lambda x: HIGHLIGHT[0] + x.group(0) + HIGHLIGHT[1],
+        text[start:start + width],
+    )
+    return (
+        ("..." if start else "")
+        + snippet
+        + ("..." if start + width < len(text) else "")
+    )
+
+
+def _fts_search(terms, limit):
+    # every term must be somewhere in the job or its comments, as with the
+    # token index, so each is matched on its own and only the jobs that
+    # have them all are kept.  bm25 is lower for better matches.
+    terms = sorted(set(terms))
+    scores = None
+    with connection.cursor() as cursor:
+        for term in terms:
+            cursor.execute(
+                f"SELECT job_id, bm25({FTS_TABLE}, 0, {TITLE_WEIGHT}, 1) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                ['"%s"' % term],
+            )
+            found = {}
+            for job_id, rank in cursor.fetchall():
+                found[job_id] = found.get(job_id, 0.0) - rank
+            if scores is None:
+                scores = found
+            else:
+                scores = {
+                    job_id: score + found[job_id]
+                    for job_id, score in scores.items() if job_id in found
+                }
+            if not scores:
+                return []
+
+        ranked = sorted(scores, key=lambda x: (-scores[x], -x))[:limit]
+
+        # snippets come from the best matching job or comment of each job.
+        cursor.execute(
+            f"SELECT job_id, snippet({FTS_TABLE}, -1, %s, %s, '...', 12) "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"AND job_id IN ({', '.join(['%s'] * len(ranked))}) "
+            f"ORDER BY bm25({FTS_TABLE}, 0, {TITLE_WEIGHT}, 1)",
+            [HIGHLIGHT[0], HIGHLIGHT[1], " OR ".join('"%s"' % x for x in terms)]
+            + ranked,
+        )
+        snippets = {}
+        for job_id, snippet in cursor.fetchall():
+            snippets.setdefault(job_id, " ".join(snippet.split()))
+
+    return [(job_id, snippets.get(job_id, "")) for job_id in ranked]
+
+
+def _token_search(terms, limit):
+    # every term must be somewhere in the job or its comments.
+    ranked = list(
+        SearchToken.objects.filter(token__in=terms)
+        .values("job_id")
+        .annotate(matched=Count("token", distinct=True), total=Sum("score"))
+        .filter(matched=len(set(terms)))
+        .order_by("-total", "-job_id")
+        .values_list("job_id", flat=True)[:limit]
+    )
+    if not ranked:
+        return []
+
+    # snippets come from the best scoring job or comment of each job.
+    sources = {}
+    for job_id, comment_id in (
+        SearchToken.objects.filter(job_id__in=ranked, token__in=terms)
+        .order_by("-score")
+        .values_list("job_id", "comment_id")
+    ):
+        sources.setdefault(job_id, comment_id)
+
+    jobs = Job.objects.in_bulk(ranked)
+    comments = Comment.objects.in_bulk(
+        [x for x in sources.values() if x is not None])
+
+    hits = []
+    for job_id in ranked:
+        comment = comments.get(sources.get(job_id))
+        if comment:
+            text = comment.content
+        else:
+            job = jobs[job_id]
+            text = "%s: %s" % (job.title, job.description)
+        hits.append((job_id, make_snippet(text, terms)))
+    return hits
+
+
+def search(query, limit=MAX_RESULTS):
+    """
+    Return [(job, snippet)] of the jobs matching every word of query, best
+    first.
+    """
+    terms = tokens(query)
+    if not terms:
+        return []
+
+    if fts_enabled():
+        hits = _fts_search(terms, limit)
+    else:
+        hits = _token_search(terms, limit)
+
+    jobs = Job.objects.select_related("bucket").in_bulk(
+        [job_id for job_id, _ in hits])
+    return [(jobs[job_id], snippet) for job_id, snippet in hits if job_id in jobs]
+
+
+def job_saved(sender, instance, raw=False, **kwargs):
+    # most saves are claims, assignments and status changes, which leave
+    # the text as it was loaded (see Job.from_db).
+    text = (instance.title, instance.description)
+    if raw or text == getattr(instance, "_indexed_text", None):
+        return
+    index_job(instance)
+    instance._indexed_text = text
+
+
+def job_deleted(sender, instance, **kwargs):
+    # the token index goes with the job, by cascade.
+    if fts_enabled():
+        _fts_replace(connection, -instance.id)
+
+
+def comment_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields and "content" not in update_fields:
+        return
+    index_comment(instance)
+
+
+def comment_deleted(sender, instance, **kwargs):
+    if fts_enabled():
+        _fts_replace(connection, instance.id)
+
+
+def connect_signals():
+    post_save.connect(job_saved, sender=Job, dispatch_uid="jobs_search_job")
+    post_delete.connect(job_deleted, sender=Job, dispatch_uid="jobs_search_job")
+    post_save.connect(
+        comment_saved, sender=Comment, dispatch_uid="jobs_search_comment")
+    post_delete.connect(
+        comment_deleted, sender=Comment, dispatch_uid="jobs_search_comment")
@@ -17,6 +17,8 @@ at_server_cold_stop()
 
 """
 
+from world.data import write_cache
+
 
 def at_server_init():
     """
@@ -30,7 +32,7 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    write_cache()
 
 
 def at_server_stop():
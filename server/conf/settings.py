@@ -37,6 +37,7 @@ SERVERNAME = "Beckoning"
 INSTALLED_APPS += ('jobs',)
 INSTALLED_APPS += ('bbs',)
 INSTALLED_APPS += ('wiki',)
+INSTALLED_APPS += ('traits',)
 
 COLOR_ANSI_EXTRA_MAP = color_markups.MUX_COLOR_ANSI_EXTRA_MAP
 COLOR_XTERM256_EXTRA_FG = color_markups.MUX_COLOR_XTERM256_EXTRA_FG
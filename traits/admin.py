@@ -0,0 +1,8 @@
+from django.contrib import admin
+
+# Register your models here.
+
+from .models import CharacterTrait, SheetSnapshot
+
+admin.site.register(CharacterTrait)
+admin.site.register(SheetSnapshot)
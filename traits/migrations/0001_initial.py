@@ -0,0 +1,64 @@
+# Generated by Django 4.1.9 on 2026-10-18 14:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("objects", "__first__"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CharacterTrait",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("category", models.CharField(max_length=50)),
+                ("trait", models.CharField(blank=True, default="", max_length=100)),
+                (
+                    "instance",
+                    models.CharField(blank=True, default="", max_length=100),
+                ),
+                (
+                    "specialty",
+                    models.CharField(blank=True, default="", max_length=100),
+                ),
+                ("value", models.IntegerField(null=True)),
+                ("text", models.TextField(blank=True, default="")),
+                ("temp", models.IntegerField(null=True)),
+                (
+                    "character",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="character_traits",
+                        to="objects.objectdb",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="charactertrait",
+            index=models.Index(
+                fields=["category", "trait", "value"],
+                name="trait_category_value_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="charactertrait",
+            constraint=models.UniqueConstraint(
+                fields=("character", "category", "trait", "instance", "specialty"),
+                name="unique_character_trait",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.1.9 on 2026-10-18 16:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("objects", "__first__"),
+        ("traits", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SheetSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("reason", models.CharField(max_length=200)),
+                ("full", models.BooleanField(default=False)),
+                ("data", models.BinaryField()),
+                (
+                    "character",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sheet_snapshots",
+                        to="objects.objectdb",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="sheetsnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("character", "number"), name="unique_sheet_snapshot"
+            ),
+        ),
+    ]
@@ -0,0 +1,209 @@
+"""
+Character stats, one row per trait.
+
+db.stats is the sheet and the only thing the commands read or write.  This
+table is a read-side mirror of it, kept up to date by
+world.stats.stats_changed, so questions like "who has Auspex 3" (see
+world.statsearch) are an indexed query instead of unpickling every
+character.  Keeping it costs each sheet write a little more, not less.
+
+A row is one of:
+
+    - a trait, e.g. ("disciplines", "auspex") with value 3.
+    - a specialty of a trait, with specialty set.
+    - a plain value of the sheet, like splat or approved, with no trait.
+
+Numbers are kept in value and everything else in text.  A trait's temp
+value lives on its row in temp.
+
+SheetSnapshot keeps the history of a sheet, see world.snapshots.
+"""
+
+import re
+from django.db import models, transaction
+from evennia.objects.models import ObjectDB
+from world.data import get_trait_category
+
+# instanced traits are kept in db.stats as e.g. Contacts(Police).
+INSTANCE_RE = re.compile(r"^(.+)\((.*)\)$")
+
+
+def split_key(key):
+    """Split a db.stats key into its trait and instance."""
+    match = INSTANCE_RE.match(str(key))
+    if match:
+        return match.group(1).lower(), match.group(2)
+    return str(key), ""
+
+
+def join_key(trait, instance):
+    """The reverse of split_key."""
+    if instance:
+        return "%s(%s)" % (trait.capitalize(), instance)
+    return trait
+
+
+def encode(value):
+    """Return (value, text) for a value from db.stats."""
+    if isinstance(value, int):
+        return int(value), ""
+    return None, "" if value is None else str(value)
+
+
+def stats_rows(stats):
+    """
+    Flatten a db.stats dict into {(category, trait, instance, specialty):
+    (value, text, temp)}.
+    """
+    rows = {}
+    owners = {}
+
+    for category, entries in stats.items():
+        if category in ("specialties", "temp"):
+            continue
+        if not isinstance(entries, dict):
+            rows[(category, "", "", "")] = encode(entries) + (None,)
+            continue
+        for key, value in entries.items():
+            row = (category,) + split_key(key) + ("",)
+            rows[row] = encode(value) + (None,)
+            owners.setdefault(key, row)
+
+    def owner(key):
+        trait, instance = split_key(key)
+        return owners.get(key) or (
+            get_trait_category(trait) or "temp", trait, instance, "")
+
+    for key, temp in (stats.get("temp") or {}).items():
+        if not isinstance(temp, int):
+            continue
+        row = owner(key)
+        value, text, _ = rows.get(row, (None, "", None))
+        rows[row] = (value, text, int(temp))
+
+    for key, specialties in (stats.get("specialties") or {}).items():
+        category, trait, instance, _ = owner(key)
+        for specialty, value in (specialties or {}).items():
+            rows[(category, trait, instance, specialty)] = encode(value) + (None,)
+
+    return rows
+
+
+class CharacterTraitManager(models.Manager):
+    def sync(self, character, stats, categories=None):
+        """
+        Bring character's rows in line with stats, a db.stats dict.  Only
+        rows that changed are written.  With categories, the db.stats
+        categories that changed, only the rows they can touch are read and
+        compared.
+        """
+        wanted = stats_rows(stats)
+        rows = self.filter(character=character)
+
+        if categories:
+            categories = set(categories)
+            scope = models.Q(category__in=categories)
+            if "specialties" in categories:
+                scope |= ~models.Q(specialty="")
+            temps = []
+            if "temp" in categories:
+                temps = [key for key, fields in wanted.items() if fields[2] is not None]
+                scope |= models.Q(temp__isnull=False)
+                for category, trait, instance, specialty in temps:
+                    scope |= models.Q(
+                        category=category,
+                        trait=trait,
+                        instance=instance,
+                        specialty=specialty,
+                    )
+            rows = rows.filter(scope)
+
+        existing = {
+            (row.category, row.trait, row.instance, row.specialty): row
+            for row in rows
+        }
+
+        if categories:
+            # leave the rows the change couldn't have touched alone.
+            temps = set(temps)
+            wanted = {
+                key: fields for key, fields in wanted.items()
+                if key[0] in categories
+                or (key[3] and "specialties" in categories)
+                or key in temps
+                or key in existing
+            }
+
+        with transaction.atomic():
+            stale = [row.pk for key, row in existing.items() if key not in wanted]
+            if stale:
+                self.filter(pk__in=stale).delete()
+
+            new = []
+            for key, fields in wanted.items():
+                row = existing.get(key)
+                if row is None:
+                    category, trait, instance, specialty = key
+                    value, text, temp = fields
+                    new.append(self.model(
+                        character=character,
+                        category=category,
+                        trait=trait,
+                        instance=instance,
+                        specialty=specialty,
+                        value=value,
+                        text=text,
+                        temp=temp,
+                    ))
+                elif (row.value, row.text, row.temp) != fields:
+                    row.value, row.text, row.temp = fields
+                    row.save(update_fields=["value", "text", "temp"])
+            if new:
+                self.bulk_create(new)
+
+
+class CharacterTrait(models.Model):
+    character = models.ForeignKey(
+        ObjectDB, related_name='character_traits', on_delete=models.CASCADE)
+    category = models.CharField(max_length=50)
+    trait = models.CharField(max_length=100, blank=True, default='')
+    instance = models.CharField(max_length=100, blank=True, default='')
+    specialty = models.CharField(max_length=100, blank=True, default='')
+    value = models.IntegerField(null=True)
+    text = models.TextField(blank=True, default='')
+    temp = models.IntegerField(null=True)
+
+    objects = CharacterTraitManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['category', 'trait', 'value'],
+                name='trait_category_value_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['character', 'category', 'trait', 'instance', 'specialty'],
+                name='unique_character_trait',
+            ),
+        ]
+
+
+class SheetSnapshot(models.Model):
+    character = models.ForeignKey(
+        ObjectDB, related_name='sheet_snapshots', on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    reason = models.CharField(max_length=200)
+    # a whole sheet, or only the changes since the snapshot before.
+    full = models.BooleanField(default=False)
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['character', 'number'],
+                name='unique_sheet_snapshot',
+            ),
+        ]
@@ -23,6 +23,7 @@ several more options for customizing the Guest account system.
 """
 
 from evennia.accounts.accounts import DefaultAccount, DefaultGuest
+from jobs.notify import JOB_NOTIFIER
 
 
 class Account(DefaultAccount):
@@ -107,6 +108,15 @@ class Account(DefaultAccount):
                 errors.extend(errs)
         return account, errors
 
+    def at_post_login(self, session=None, **kwargs):
+        super().at_post_login(session=session, **kwargs)
+        JOB_NOTIFIER.connected(self)
+
+    def at_disconnect(self, reason=None, **kwargs):
+        super().at_disconnect(reason=reason, **kwargs)
+        JOB_NOTIFIER.disconnected(self)
+
+
 class Guest(DefaultGuest):
     """
     This class is used for guest logins. Unlike Accounts, Guests and their
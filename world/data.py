@@ -1,1136 +1,546 @@
+"""
+Game data: how the sheet is laid out, every trait and the values it can take.
+
+The tables live in YAML files in world/gamedata, sheet.yaml plus one file per
+trait category.  They are read and checked the first time this module is
+imported.  The checked tables are pickled to world/gamedata/.compiled.pickle,
+with a hash of the files, by write_cache when the server starts and by
+reload_data, never by the import itself.  Later starts load the pickle
+instead for as long as the files don't change, and only build the trait
+registry from it.
+
+reload_data() re-reads the files in a running game (see the reloaddata
+command).  The tables are updated in place, so modules that imported them
+see the new data, and every function in RELOAD_HOOKS is then called to
+rebuild anything compiled from them.
+"""
+
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import NamedTuple
 
-IC = 12
-
-
-STATS = {
-    "attributes": {
-        "strength": 1,
-        "dexterity": 1,
-        "stamina": 1,
-        "charisma": 1,
-        "manipulation": 1,
-        "composure": 1,
-        "intelligence": 1,
-        "wits": 1,
-        "resolve": 1
-    },
-    "skills": {},
-    "disciplines": {},
-    "specialties": {},
-    "backgrounds": {},
-    "pools": {},
-    "advantages": {},
-    "flaws": {},
-    "bio": {},
-    "splat": "",
-    "notes": "",
-    "approved_by": "",
-    "approved": False
-}
-
-BIO = [
-    "full name",
-    "birthdate",
-    "concept",
-    "splat",
-    "ambition",
-    "sire",
-    "desire",
-    "predator",
-    "clan",
-    "generation",
-]
-
-
-SPLATS = [
-    "vampire",
-    "ghoul",
-    "mortal",
-]
-
-ATTRIBUTES = [
-    "strength",
-    "dexterity",
-    "stamina",
-    "charisma",
-    "manipulation",
-    "composure",
-    "intelligence",
-    "wits",
-    "resolve"
-]
-
-MENTAL = [
-    "intelligence",
-    "wits",
-    "resolve",
-    "academics",
-    "awareness",
-    "finance",
-    "investigation",
-    "medicine",
-    "occult",
-    "politics",
-    "science",
-    "technology"
-]
-
-PHYSICAL = [
-    "strength",
-    "dexterity",
-    "stamina",
-    "athletics",
-    "brawl",
-    "craft",
-    "drive",
-    "firearms",
-    "larceny",
-    "melee",
-    "stealth",
-    "survival"
-]
-
-SOCIAL = [
-    "charisma",
-    "manipulation",
-    "composure",
-    "animal ken",
-    "etiquette",
-    "insight",
-    "intimidation",
-    "leadership",
-    "performance",
-    "persuasion",
-    "streetwise",
-    "subterfuge"
-]
-
-SKILLS = [
-    "athletics",
-    "brawl",
-    "craft",
-    "drive",
-    "firearms",
-    "larceny",
-    "melee",
-    "stealth",
-    "survival",
-    "animal ken",
-    "etiquette",
-    "insight",
-    "intimidation",
-    "leadership",
-    "performance",
-    "persuasion",
-    "streetwise",
-    "subterfuge",
-    "academics",
-    "awareness",
-    "finance",
-    "investigation",
-    "medicine",
-    "occult",
-    "politics",
-    "science",
-    "technology"
-]
-
-DISCIPLINES = [
-    "animalism",
-    "auspex",
-    "celerity",
-    "dominate",
-    "fortitude",
-    "obfuscate",
-    "oblivion",
-    "potence",
-    "presence",
-    "protean",
-    "blood sorcery",
-    "thin-blood alchemy"
-]
-ADVANTAGES = [
-    "beautiful",
-    "stunning",
-    "high-functioning addict",
-    "bond resistance",
-    "short bond",
-    "unbondable",
-    "bloodhound",
-    "iron gullet",
-    "eat food",
-    "allies",
-    "contacts",
-    "fame",
-    "influence",
-    "haven",
-    "herd",
-    "mask",
-    "zeroed",
-    "cobbler",
-    "mawla",
-    "resources",
-    "retainers",
-    "status"
-]
-FLAWS = [
-    "illiterate",
-    "repulsive",
-    "vile",
-    "hopeless addiction",
-    "addiction",
-    "archaic",
-    "lving in the past",
-    "bondslave",
-    "bond junkie",
-    "long bond",
-    "farmer",
-    "organovore",
-    "methuselah's thirst",
-    "prey exclusion",
-    "stake bait",
-    "bane",
-    "folklore block",
-    "stigmata",
-    "dark secret",
-    "dispised",
-    "disliked",
-    "no haven",
-    "known blankbody",
-    "known corpse",
-    "adversary",
-    "destitude",
-    "stalkers",
-    "shunned",
-    "suspect",
-]
-
-
-POOLS = [
-    "health",
-    "willpower",
-    "blood",
-    "humanity",
-    "morality",
-    "blood potency",
-    "hunger"
-]
 
+IC = 12
 
 INSTANCED = []
 
-
-BIO_GOOD_VALUES = {
-    "default": {
-        "values": [],
-        "check": lambda x: True,
-        "check_message": "Permission Denied",
-        "instanced": False,
-        "has_specialties": False,
-        "specialties": {}
-
-    },
-    "clan": {
-        "values": [
-            "banu haqim",
-            "brujah",
-            "caitiff",
-            "gangrel",
-            "hecata",
-            "lasombra",
-            "malkavian",
-            "the ministry",
-            "nosferatu",
-            "ravnos",
-            "salubri",
-            "toreador",
-            "tremere",
-            "tzimisce",
-            "ventrue",
-            "thin-blood"
-        ],
-        "check": lambda x: x["splat"] in "vampire",
-        "check_message": "Clan is only available to vampires."
-    },
-    "sire": {
-        "values": [],
-        "check": lambda x: x["splat"] in "vampire",
-        "check_message": "Sire is only available to vampires."
-    },
-    "generation": {
-        "values": [16, 15, 14, 13, 12, 11, 10],
-        "check": lambda x: x["splat"] in "vampire",
-        "check_message": "Generation is only available to vampires."
-    },
-    "predator": {
-        "values": [
-            "alleycat",
-            "bagger",
-            "blood leech",
-            "cleaver",
-            "consensualist",
-            "extortionist",
-            "farmer",
-            "graverobber",
-            "grim reaper",
-            "montero",
-            "osiris",
-            "pursuer",
-            "roadside killer",
-            "sandman",
-            "scenequeen",
-            "siren",
-            "trapdoor"
-        ],
-        "check": lambda x: "vampire" in x["splat"],
-        "check_message": "Predator is only available to vampires."
-    },
-}
-
-ATTRIBUTES_GOOD_VALUES = {
-    "default": {
-        "values": range(1, 20),
-        "check": lambda x: True,
-        "check_message": "You must have at least one dot in each attribute.",
-        "instanced": False,
-        "instances": [],
-        "has_specialties": False,
-        "specialties": {}
-    },
-}
-
-SKILLS_GOOD_VALUES = {
-    "default": {
-        "values": range(1, 5),
-        "check": lambda x: True,
-        "check_message": "Permission Denied",
-        "instanced": False,
-        "instances": [],
-        "has_specialties": True,
-        "specialties": {}
-    }
-}
-
-
-ADVANTAGES_GOOD_VALUES = {
-    "default": {
-        "values": [],
-        "check": lambda x: True,
-        "check_message": "Permission Denied",
-        "instanced": False,
-        "instances": [],
-        "has_specialties": False,
-        "specialties": {}
-    },
-    "beautiful": {"values": [2]},
-    "stunning": {"values": [4]},
-    "high-functioning addict": {"values": [1]},
-    "bond resistance": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Bond Resistance is only available to vampires."
-    },
-    "short bond": {
-        "values": [2],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Short Bond is only available to vampires."
-    },
-    "unbondable": {
-        "values": [4],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Unbondable is only available to vampires."
-    },
-    "bloodhound": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Bloodhound is only available to vampires."
-    },
-    "iron gullet": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Iron Gullet is only available to vampires."
-    },
-    "eat food": {
-        "values": [2],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Eat Food is only available to vampires."
-    },
-    "allies": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True
-    },
-    "contacts": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True
-    },
-    "fame": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True
-    },
-    "fame": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True
-    },
-    "haven": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True
-    },
-    "herd": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True,
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Herd is only available to vampires."
-    },
-    "influence": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True
-    }, "mask": {
-        "values": [1, 2],
-        "instanced": True,
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Mask is only available to vampires."
-    },
-    "status": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True
-    },
-    "zeroed": {
-        "values": [1],
-        "check": lambda x: x["advantages"]["mask"] == 2,
-        "check_message": "Zeroed is only available to vampires with Mask 2."
-    },
-    "cobbler": {
-        "values": [1],
-        "check": lambda x: x["advantages"]["mask"] == 2,
-        "check_message": "Cobbler is only available to vampires with Mask 2."
-    },
-    "mawla": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True,
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Mawla is only available to vampires."
-    },
-    "resources": {
-        "values": [1, 2, 3, 4, 5],
-    },
-    "retainer": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True,
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Retainer is only available to vampires."
-    }
-}
-
-
-FLAWS_GOOD_VALUES = {
-    "default": {
-        "values": [],
-        "check": lambda x: True,
-        "check_message": "Permission Denied",
-        "instanced": False,
-        "instances": [],
-        "has_specialties": False,
-        "specialties": {}
-    },
-    "illiterate": {"values": [1]},
-    "repulsive": {"values": [2]},
-    "vile": {"values": [4]},
-    "hopeless addiction": {"values": [2]},
-    "addiction": {"values": [1]},
-    "archaic": {
-        "values": [1], "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Archaic is only available to vampires."
-    },
-    "living in the past": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Living in the Past is only available to vampires."
-    },
-    "bondslave": {
-        "values": [2],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Bondslave is only available to vampires."
-    },
-    "bond junkie": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Bond Junkie is only available to vampires."
-    },
-    "long bond": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Long Bond is only available to vampires."
-    },
-    "farmer": {
-        "values": [2],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Farmer is only available to vampires."
-    },
-    "organavore": {
-        "values": [2],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Organavore is only available to vampires."
-    },
-    "methuselah's thirst": {
-        "values": [3], "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Methuselah's Thirst is only available to vampires."
-    },
-    "prey exclusion": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Prey Exclusion is only available to vampires.",
-        "instanced": True
-    },
-    "stake bait": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Stake Bait is only available to vampires."
-    },
-    "folklore bane": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Folklore Bane is only available to vampires."
-    },
-    "folklore block": {
-        "values": [2],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Folklore Block is only available to vampires."
-    },
-    "dark secret": {
-        "values": [1, 2],
-        "instanced": True
-    },
-    "despised": {
-        "values": [2],
-        "instnaed": True
-    },
-    "disliked": {
-        "values": [1],
-        "instanced": True
-    },
-    "no haven": {
-        "values": [1],
-    },
-    "obvious predator": {
-        "values": [2],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Obvious Predator is only available to vampires."
-    },
-    "knowwn blankbody": {
-        "values": [2],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Known Blankbody is only available to vampires."
-    },
-    "known corpse": {
-        "values": [1],
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Known Corpse is only available to vampires."
-    },
-    "adverssary": {
-        "values": [1, 2, 3, 4, 5],
-        "instanced": True,
-        "check": lambda x: x["splat"] == "vampire",
-        "check_message": "Adversary is only available to vampires."
-    },
-    "destitute": {
-        "values": [1],
-    },
-    "stalkers": {"values": [1]},
-    "shunned": {
-        "values": [2],
-        "instanced": True
-    },
-    "suspect": {
-        "values": [1],
-        "instanced": True
-    }
-
-}
-
-
-DISCIPLINES_GOOD_VALUES = {
-    "animalism": {
-        "values": range(1, 6),
-        "check_message": "Animalism is only available to vampires.",
-        "instanced": False,
-        "instances": [],
-        "has_specialties": True,
-        "specialties": {
-            "bond famulus": {
-                "values": [1],
-                "check": lambda x: x.disciplines["animalism"] >= 1,
-                "check_message": "Animalism 1 is required."
-            },
-            "sense the beast": {
-                "values": [1],
-                "check": lambda x: x.disciplines["animalism"] >= 1,
-                "check_message": "Animalism 1 is required."
-            },
-            "feral whispers": {
-                "values": [2],
-                "check": lambda x: x.disciplines["animalism"] >= 2,
-                "check_message": "Animalism 2 is required."
-            },
-            "animal succulence": {
-                "values": [3],
-                "check": lambda x: x.disciplines["animalism"] >= 3,
-                "check_message": "Animalism 3 is required."
-            },
-            "quell the beast": {
-                "values": [3],
-                "check": lambda x: x.disciplines["animalism"] >= 3,
-                "check_message": "Animalism 3 is required."
-            },
-            "living hive": {
-                "values": [3],
-                "check": lambda x: x.disciplines["obfuscate"] >= 2 and x.disciplines["animalism"] >= 3,
-                "check_message": "Obfuscate 2 and Animalism 3 are required."
-            },
-            "subsume the spirit": {
-                "values": [4],
-                "check": lambda x: x.disciplines["animalism"] >= 4,
-                "check_message": "Animalism 4 is required."
-            },
-            "animal dominion": {
-                "values": [5],
-                "check": lambda x: x.disciplines["animalism"] >= 5,
-                "check_message": "Animalism 5 is required."
-            },
-            "draw out the beast": {
-                "values": [5],
-                "check": lambda x: x.disciplines["animalism"] >= 5,
-                "check_message": "Animalism 5 is required."
-            }
-        },
-    },
-    "auspex": {
-        "values": range(1, 6),
-        "has_specialties": True,
-        "check_message": "Auspex is only available to vampires.",
-        "specialties": {
-            "heightened senses": {
-                "values": [1],
-                "check": lambda x: x.disciplines["auspex"] >= 1,
-                "check_message": "Auspex 1 is required."
-            },
-            "sense the unseen": {
-                "values": [1],
-                "check": lambda x: x.disciplines["auspex"] >= 1,
-                "check_message": "Auspex 1 is required."
-            },
-            "premonition": {
-                "values": [2],
-                "check": lambda x: x.disciplines["auspex"] >= 2,
-                "check_message": "Auspex 2 is required."
-            },
-            "scry the soul": {
-                "values": [3],
-                "check": lambda x: x.disciplines["auspex"] >= 3,
-                "check_message": "Auspex 3 is required."
-            },
-            "shared senses": {
-                "values": [3], "check": lambda x: x.disciplines["auspex"] >= 3,
-                "check_message": "Auspex 3 is required."
-            },
-            "spirits touch": {
-                "values": [4],
-                "check": lambda x: x.disciplines["auspex"] >= 4,
-                "check_message": "Auspex 4 is required."
-            },
-            "clairvoyance": {
-                "values": [5],
-                "check": lambda x: x.disciplines["auspex"] >= 5,
-                "check_message": "Auspex 5 is required."
-            },
-            "possession": {
-                "values": [5],
-                "check": lambda x: x.disciplines["auspex"] >= 5 and x["dominate"] >= 3,
-                "check_message": "Auspex 5 and Dominate 3 are required."
-            },
-            "telepathy": {
-                "values": [5],
-                "check": lambda x: x.disciplines["auspex"] >= 5,
-                "check_message": "Auspex 5 is required."
-            }
-        }
-    },
-    "celerity": {
-        "values": range(1, 6),
-        "has_specialties": True,
-        "check_message": "Celerity is only available to vampires.",
-        "specialties": {
-            "cats grace": {
-                "values": [1],
-                "check": lambda x: x.disciplines["celerity"] >= 1,
-                "check_message": "Celerity 1 is required."
-            },
-            "fleetness": {
-                "values": [2],
-                "check": lambda x: x.disciplines["celerity"] >= 2,
-                "check_message": "Celerity 2 is required."
-            },
-            "blink": {
-                "values": [3],
-                "check": lambda x: x.disciplines["celerity"] >= 3,
-                "check_message": "Celerity 3 is required."
-            },
-            "traversal": {
-                "values": [3],
-                "check": lambda x: x.disciplines["celerity"] >= 3,
-                "check_message": "Celerity 3 is required."
-            },
-            "draught of elegance": {
-                "values": [4],
-                "check": lambda x: x.disciplines["celerity"] >= 4,
-                "check_message": "Celerity 4 is required."
-            },
-            "unerring aim": {
-                "values": [4],
-                "check": lambda x: x.disciplines["celerity"] >= 4 and x["auspex"] >= 2,
-                "check_message": "Celerity 4 and Auspex 2 are required."
-            },
-            "lightning strike": {
-                "values": [5],
-                "check": lambda x: x.disciplines["celerity"] >= 5,
-                "check_message": "Celerity 5 is required."
-            },
-            "split second": {
-                "values": [5],
-                "check": lambda x: x.disciplines["celerity"] >= 5,
-                "check_message": "Celerity 5 is required."
-            },
-        }
-    },
-    "dominate": {
-        "values": range(1, 6),
-        "has_specialties": True,
-        "check_message": "Dominate is only available to vampires.",
-        "specialties": {
-            "cloud memory": {
-                "values": [1],
-                "check": lambda x: x.disciplines["dominate"] >= 1,
-                "check_message": "Dominate 1 is required."
-            },
-            "compel": {
-                "values": [1],
-                "check": lambda x: x.disciplines["dominate"] >= 1,
-                "check_message": "Dominate 1 is required."
-            },
-            "mesmerize": {
-                "values": [2],
-                "check": lambda x: x.disciplines["dominate"] >= 2,
-                "check_message": "Dominate 2 is required."
-            },
-            "dementation": {
-                "values": [2],
-                "check": lambda x: x.disciplines["dominate"] >= 2 and x["obfuscate"] >= 2,
-                "check_message": "Dominate 2 and Obfuscate 2 are required."
-            },
-            "submerged directive": {
-                "values": [2],
-                "check": lambda x: x.disciplines["dominate"] >= 2,
-                "check_message": "Dominate 2 is required."
-            },
-            "the forgetful mind": {
-                "values": [3],
-                "check": lambda x: x.disciplines["dominate"] >= 3,
-                "check_message": "Dominate 3 is required."
-            },
-            "rationalize": {
-                "values": [4],
-                "check": lambda x: x.disciplines["dominate"] >= 4,
-                "check_message": "Dominate 4 is required."
-            },
-            "mass manipulation": {
-                "values": [5],
-                "check": lambda x: x.disciplines["dominate"] >= 5,
-                "check_message": "Dominate 5 is required."
-            },
-            "terminal decree": {
-                "values": [5],
-                "check": lambda x: x.disciplines["dominate"] >= 5,
-                "check_message": "Dominate 5 is required."
-            },
-        },
-    },
-
-    "fortitude": {
-        "values": range(1, 6),
-        "has_specialties": True,
-        "check_message": "Fortitude is only available to vampires.",
-        "specialties": {
-            "resilience": {
-                "values": [1],
-                "check": lambda x: x.disciplines["fortitude"] >= 1,
-                "check_message": "Fortitude 1 is required."
-            },
-            "unswayable mind": {
-                "values": [1],
-                "check": lambda x: x.disciplines["fortitude"] >= 1,
-                "check_message": "Fortitude 1 is required."
-            }
-        },
-        "toughness": {
-            "values": [2],
-            "check": lambda x: x.disciplines["fortitude"] >= 2,
-            "check_message": "Fortitude 2 is required."
-        },
-        "enduuring Bbest": {
-            "values": [2],
-            "check": lambda x: x.disciplines["fortitude"] >= 2,
-            "check_message": "Fortitude 2 is required."
-        },
-        "fortify the inner facade": {
-            "values": [3],
-            "check": lambda x: x.disciplines["fortitude"] >= 3,
-            "check_message": "Fortitude 3 is required."
-        },
-        "draught of endurance": {
-            "values": [4],
-            "check": lambda x: x.disciplines["fortitude"] >= 3,
-            "check_message": "Fortitude 4 is required."
-        },
-        "flesh of marble": {
-            "values": [5],
-            "check": lambda x: x.disciplines["fortitude"] >= 5,
-            "check_message": "Fortitude 5 is required."
-        },
-        "prowess from pain": {
-            "values": [5],
-            "check": lambda x: x.disciplines["fortitude"] >= 5,
-            "check_message": "Fortitude 5 is required."
-        },
-    },
-
-    "obfuscate": {
-        "values": range(1, 6),
-        "has_specialties": True,
-        "check_message": "Obfuscate is only available to vampires.",
-        "specialties": {
-            "cloak of shadows": {
-                "values": [1],
-                "check": lambda x: x.disciplines["obfuscate"] >= 1,
-                "check_message": "Obfuscate 1 is required."
-            }
-        },
-        "unseen passage": {
-            "values": [2],
-            "check": lambda x: x.disciplines["obfuscate"] >= 2,
-            "check_message": "Obfuscate 2 is required."
-        },
-        "ghost in the mahine": {
-            "values": [3],
-            "check": lambda x: x.disciplines["obfuscate"] >= 3,
-            "check_message": "Obfuscate 3 is required."
-        },
-        "mask of a thousand faces": {
-            "values": [4],
-            "check": lambda x: x.disciplines["obfuscate"] >= 4,
-            "check_message": "Obfuscate 4 is required."
-        },
-
-        "conseal": {
-            "values": [4],
-            "check": lambda x: x.disciplines["obfuscate"] >= 4,
-            "check_message": "Obfuscate 4 is required."
-        },
-        "vaniah": {
-            "values": [5],
-            # make sure they ahve the right disciplone level AND stat category in tests?
-            "check": lambda x: x.disciplines["obfuscate"] >= 4 and x.specialties["cloak of shadows"] >= 4,
-            "check_message": "Obfuscate 4 and Cloak of Shadows 4 are required."
-
-        },
-        "imposters guise": {
-            "values": [5],
-            "check": lambda x: x.disciplines["obfuscate"] >= 5 and x.specialties["mask of a thousand faces"] >= 4,
-            "check_message": "Obfuscate 5 and Mask of a Thousand Faces 4 are required."
-        },
-
-    },
-    "potence": {
-        "values": range(1, 6),
-        "has_specialties": True,
-        "check_message": "Potence is only available to vampires.",
-        "specialties": {
-            "lethhal body": {
-                "values": [1],
-                "check": lambda x: x.disciplines["potence"] >= 1,
-                "check_message": "Potence 1 is required."
-            },
-            "soaring leap": {
-                "values": [1],
-                "check": lambda x: x.disciplines["potence"] >= 1,
-                "check_message": "Potence 1 is required."
-            },
-            "prowess": {
-                "values": [2],
-                "check": lambda x: x.disciplines["potence"] >= 2,
-                "check_message": "Potence 2 is required."
-            },
-            "brutal feed": {
-                "values": [3],
-                "check": lambda x: x.disciplines["potence"] >= 3,
-                "check_message": "Potence 3 is required."
-            },
-            "spark of rage": {
-                "values": [3],
-                "check": lambda x: x.disciplines["potence"] >= 3,
-                "check_message": "Potence 3 is required."
-            },
-            "uncanny grip": {
-                "values": [3],
-                "check": lambda x: x.disciplines["potence"] >= 3,
-            },
-            "draught of might": {
-                "values": [4],
-                "check": lambda x: x.disciplines["potence"] >= 4,
-                "check_message": "Potence 4 is required."
-            },
-            "earth shock": {
-                "values": [4],
-                "check": lambda x: x.disciplines["potence"] >= 4,
-                "check_message": "Potence 4 is required."
-            },
-            "fist of caine": {
-                "values": [5],
-                "check": lambda x: x.disciplines["potence"] >= 5,
-                "check_message": "Potence 5 is required."
-            }
-        },
-    },
-    "presence": {
-        "values": range(1, 6),
-        "has_specialties": True,
-        "check_message": "Presence is only available to vampires.",
-        "specialties": {
-            "awe": {
-                "values": [1],
-                "check": lambda x: x.disciplines["presence"] >= 1,
-                "check_message": "Presence 1 is required."
-            },
-            "daunt": {
-                "values": [1],
-                "check": lambda x: x.disciplines["presence"] >= 1,
-                "check_message": "Presence 1 is required."
-            },
-            "lingering kiss": {
-                "values": [2],
-                "check": lambda x: x.disciplines["presence"] >= 2,
-                "check_message": "Presence 2 is required."
-            },
-            "dread gaze": {
-                "values": [3],
-                "check": lambda x: x.disciplines["presence"] >= 3,
-                "check_message": "Presence 3 is required."
-            },
-            "entrancement": {
-                "values": [3],
-                "check": lambda x: x.disciplines["presence"] >= 3,
-                "check_message": "Presence 3 is required."
-            },
-            "irresistable voice": {
-                "values": [4],
-                "check": lambda x: x.disciplines["presence"] >= 4,
-                "check_message": "Presence 4 is required."
-            },
-
-            "summon": {
-                "values": [4],
-                "check": lambda x: x.disciplines["presence"] >= 4,
-                "check_message": "Presence 4 is required."
-            },
-            "majesty": {
-                "values": [5],
-                "check": lambda x: x.disciplines["presence"] >= 5,
-                "check_message": "Presence 5 is required."
-            },
-            "star magnetism": {
-                "values": [5],
-                "check": lambda x: x.disciplines["presence"] >= 5,
-                "check_message": "Presence 5 is required."
-            },
-        },
-        "protean": {
-            "values": range(1, 6),
-            "has_specialties": True,
-            "check_message": "Protean is only available to vampires.",
-            "specialties": {
-                "eyes of the beast": {
-                    "values": [1],
-                    "check": lambda x: x.disciplines["protean"] >= 1,
-                    "check_message": "Protean 1 is required."
-                },
-                "weight of the feather": {
-                    "values": [1],
-                    "check": lambda x: x.disciplines["protean"] >= 1,
-                    "check_message": "Protean 1 is required."
-                },
-                "feral weapons": {
-                    "values": [2],
-                    "check": lambda x: x.disciplines["protean"] >= 2,
-                    "check_message": "Protean 2 is required."
-                },
-                "earth meld": {
-                    "values": [3],
-                    "check": lambda x: x.disciplines["protean"] >= 3,
-                    "check_message": "Protean 3 is required."
-                },
-                "shape change": {
-                    "values": [3],
-                    "check": lambda x: x.disciplines["protean"] >= 3,
-                    "check_message": "Protean 3 is required."
-                },
-                "metamorphosis": {
-                    "values": [4],
-                    "check": lambda x: x.disciplines["protean"] >= 4,
-                    "check_message": "Protean 4 is required."
-                },
-                "mist form": {
-                    "values": [5],
-                    "check": lambda x: x.disciplines["protean"] >= 5,
-                    "check_message": "Protean 5 is required."
-                },
-                "unfettered heart": {
-                    "values": [5],
-                    "check": lambda x: x.disciplines["protean"] >= 5,
-                    "check_message": "Protean 5 is required."
-                },
-            },
-        },
-        "blood_sorcery": {
-            "values": range(1, 6),
-            "has_specialties": True,
-            "check_message": "Blood Sorcery is only available to vampires.",
-            "specialties": {
-                "corrosive vitae": {
-                    "values": [1],
-                    "check": lambda x: x.disciplines["blood_sorcery"] >= 1,
-                    "check_message": "Blood Sorcery 1 is required."
-                },
-                "a taste for blood": {
-                    "values": [1],
-                    "check": lambda x: x.disciplines["blood_sorcery"] >= 1,
-                    "check_message": "Blood Sorcery 1 is required."
-                },
-                "extinguish vitae": {
-                    "values": [2],
-                    "check": lambda x: x.disciplines["blood_sorcery"] >= 2,
-                    "check_message": "Blood Sorcery 2 is required."
-                },
-                "blood of potency": {
-                    "values": [3],
-                    "check": lambda x: x.disciplines["blood_sorcery"] >= 3,
-                    "check_message": "Blood Sorcery 3 is required."
-                },
-                "scorpion's touch": {
-                    "values": [3],
-                    "check": lambda x: x.disciplines["blood_sorcery"] >= 3,
-                    "check_message": "Blood Sorcery 3 is required."
-                },
-                "theft of vitae": {
-                    "values": [4],
-                    "check": lambda x: x.disciplines["blood_sorcery"] >= 4,
-                    "check_message": "Blood Sorcery 4 is required."
-                },
-                "baal's caress": {
-                    "values": [5],
-                    "check": lambda x: x.disciplines["blood_sorcery"] >= 5,
-                    "check_message": "Blood Sorcery 5 is required."
-                },
-                "cauldron of blood": {
-                    "values": [5],
-                    "check": lambda x: x.disciplines["blood_sorcery"] >= 5,
-                    "check_message": "Blood Sorcery 5 is required."
-                },
-            }
-        },
-        "default": {
-            "values": [],
-            "check": lambda x: x["splat"] in "vampire",
-            "check_message": "Permission Denied",
-            "instanced": False,
-            "instances": [],
-            "has_specialties": False,
-            "specialties": {}
-        }
-    }
-
+# where the data files are, and the compiled cache of them.
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gamedata")
+CACHE_PATH = os.path.join(DATA_DIR, ".compiled.pickle")
+
+# the version of the data files this module reads.
+DATA_VERSION = 1
+
+# bump when the compiled form changes, so old caches are thrown away.
+CACHE_FORMAT = 1
+
+# the trait files, in the order traits are resolved.
+TRAIT_FILES = (
+    "bio",
+    "attributes",
+    "skills",
+    "advantages",
+    "flaws",
+    "disciplines",
+    "pools",
+)
+
+# the keys an entry in a trait file's values can have, and a power's.
+ENTRY_KEYS = {
+    "values",
+    "check",
+    "check_message",
+    "instanced",
+    "instances",
+    "has_specialties",
+    "specialties",
 }
-
-
-POOLS_GOOD_VALUES = {
-    "default": {"values": [], "check": lambda x: True, "check_message": "Permission Denied", "specialties": False, "specialties": {}},
-    "humanity": {"values": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10], "check": lambda x: x["splat"] == "vampire"},
-    "willpower": {"values": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]},
-    "blood potency": {"values": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10], "check": lambda x: x["splat"] == "vampire"},
-    "health": {"values": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]},
-    "hunger": {"values": [1, 2, 3, 4, 5], "check": lambda x: x["splat"] == "vampire"},
+POWER_KEYS = {"values", "requires"}
+
+# Filled in from the data files by _install at the bottom of this module.
+STATS = {}
+SPLATS = []
+PHYSICAL = []
+MENTAL = []
+SOCIAL = []
+TRAIT_ABBREVIATIONS = {}
+
+BIO = []
+ATTRIBUTES = []
+SKILLS = []
+ADVANTAGES = []
+FLAWS = []
+DISCIPLINES = []
+POOLS = []
+
+BIO_GOOD_VALUES = {}
+ATTRIBUTES_GOOD_VALUES = {}
+SKILLS_GOOD_VALUES = {}
+ADVANTAGES_GOOD_VALUES = {}
+FLAWS_GOOD_VALUES = {}
+DISCIPLINES_GOOD_VALUES = {}
+POOLS_GOOD_VALUES = {}
+
+TOTAL_TRAITS = []
+
+# called with no arguments after the data has been reloaded.
+RELOAD_HOOKS = []
+
+# goes up by one every time the data is reloaded.
+DATA_GENERATION = 0
+
+
+class GameDataError(ValueError):
+    """A data file is missing or has a mistake in it."""
+
+
+@dataclass(frozen=True, slots=True)
+class TraitCheck:
+    """
+    A trait's check, compiled from the "check" mapping in its data.  Each
+    requirement is a path into db.stats and the value it must have, or a
+    list of the values it may have.
+
+        check: {splat: vampire}
+        check: {advantages: {mask: 2}}
+    """
+    requires: tuple
+
+    def __call__(self, stats):
+        for path, value in self.requires:
+            current = stats
+            try:
+                for key in path:
+                    current = current[key]
+            except (KeyError, TypeError):
+                return False
+            if isinstance(value, tuple):
+                if current not in value:
+                    return False
+            elif current != value:
+                return False
+        return True
+
+
+def _compile_check(check, path=()):
+    """Flatten a check mapping into TraitCheck's ((path, value), ...)."""
+    requires = []
+    for key, value in check.items():
+        if isinstance(value, dict):
+            requires += _compile_check(value, path + (key,))
+        elif isinstance(value, list):
+            requires.append((path + (key,), tuple(value)))
+        else:
+            requires.append((path + (key,), value))
+    return tuple(requires)
+
+
+# Defaults used when neither the trait entry nor the table's "default" entry
+# provides a value.
+TRAIT_DEFAULTS = {
+    "values": [],
+    "check": None,
+    "check_message": "Permission denied.",
+    "has_specialties": False,
+    "specialties": {},
+    "instanced": False,
+    "instances": [],
 }
 
 
-TOTAL_TRAITS = [
-    ("bio", BIO, BIO_GOOD_VALUES),
-    ("attributes", ATTRIBUTES, ATTRIBUTES_GOOD_VALUES),
-    ("skills", SKILLS, SKILLS_GOOD_VALUES),
-    ("advantages", ADVANTAGES, ADVANTAGES_GOOD_VALUES),
-    ("flaws", FLAWS, FLAWS_GOOD_VALUES),
-    ("disciplines", DISCIPLINES, DISCIPLINES_GOOD_VALUES),
-    ("pools", POOLS, POOLS_GOOD_VALUES),
-]
+@dataclass(frozen=True, slots=True)
+class TraitSpec:
+    """
+    The compiled rules for a single trait.  One is built per trait when this
+    module is imported and get_trait_list hands out the shared instance.
+
+    values keeps the table order for display, value_set is what membership
+    tests should use.
+    """
+    trait: str
+    category: str
+    values: tuple
+    value_set: frozenset
+    check: TraitCheck
+    check_message: str
+    has_specialties: bool
+    specialties: MappingProxyType
+    instanced: bool
+    instances: tuple
+
+
+def _build_trait_spec(category, trait, table):
+    """
+    Build the TraitSpec for a single trait.  Traits with their own entry in
+    the good values table use it, everything else falls back to the table's
+    "default" entry.  Keys missing from the entry use TRAIT_DEFAULTS.
+    """
+    entry = table.get(trait, table.get("default", {}))
+
+    def get(key):
+        return entry.get(key, TRAIT_DEFAULTS[key])
+
+    # specialties only count when the entry defines both keys.
+    if "has_specialties" in entry and "specialties" in entry:
+        has_specialties = entry["has_specialties"]
+        specialties = entry["specialties"]
+    else:
+        has_specialties = TRAIT_DEFAULTS["has_specialties"]
+        specialties = TRAIT_DEFAULTS["specialties"]
+
+    values = tuple(get("values"))
+    check = get("check")
+    return TraitSpec(
+        trait=trait,
+        category=category,
+        values=values,
+        value_set=frozenset(values),
+        check=TraitCheck(_compile_check(check)) if check else None,
+        check_message=get("check_message"),
+        has_specialties=has_specialties,
+        specialties=MappingProxyType(specialties),
+        instanced=get("instanced"),
+        instances=tuple(get("instances")),
+    )
+
+
+# Match ranks, best first.
+MATCH_EXACT = 0
+MATCH_PREFIX = 1
+MATCH_SUBSTRING = 2
+
+
+class TraitMatch(NamedTuple):
+    spec: TraitSpec
+    rank: int
+
+
+def _build_trait_registry(total_traits):
+    """
+    Compile total_traits, laid out like TOTAL_TRAITS, into the lookup
+    structures used by the resolver.
+
+    Returns a tuple of:
+        records - trait name -> TraitSpec, first category wins.
+        matches - every substring of every trait name -> tuple of
+            TraitMatch, ranked exact, prefix, substring and then by
+            position in TOTAL_TRAITS.
+    """
+    records = {}
+    for category, traits, table in total_traits:
+        for trait in traits:
+            if trait not in records:
+                records[trait] = _build_trait_spec(category, trait, table)
+
+    found = {}
+    for order, (trait, spec) in enumerate(records.items()):
+        for start in range(len(trait)):
+            for end in range(start + 1, len(trait) + 1):
+                fragment = trait[start:end]
+                if fragment == trait:
+                    rank = MATCH_EXACT
+                elif start == 0:
+                    rank = MATCH_PREFIX
+                else:
+                    rank = MATCH_SUBSTRING
+
+                # a fragment can occur more than once in a name, keep the best.
+                best = found.setdefault(fragment, {})
+                if trait not in best or rank < best[trait][0]:
+                    best[trait] = (rank, order, spec)
+
+    matches = {}
+    for fragment, best in found.items():
+        ranked = sorted(best.values(), key=lambda x: x[:2])
+        matches[fragment] = tuple(
+            TraitMatch(spec, rank) for rank, _, spec in ranked)
+
+    return records, matches
+
+
+TRAIT_REGISTRY = {}
+TRAIT_MATCHES = {}
+
+
+def match_traits(string):
+    """
+    Return every trait matching string as a tuple of TraitMatch, best
+    first.  Abbreviations from TRAIT_ABBREVIATIONS count as exact matches.
+    """
+    string = string.strip().lower()
+    if string in TRAIT_ABBREVIATIONS:
+        return (TraitMatch(TRAIT_REGISTRY[TRAIT_ABBREVIATIONS[string]], MATCH_EXACT),)
+    return TRAIT_MATCHES.get(string, ())
+
+
+def resolve_trait(string):
+    """
+    Resolve string to a single trait without guessing.
+
+    Returns a tuple of (spec, candidates).  spec is the TraitSpec when
+    exactly one trait is the best match, otherwise None.  candidates holds
+    the specs that tied for the best match, so a caller can tell "no such
+    trait" (empty) from "ambiguous" (more than one).
+    """
+    matches = match_traits(string)
+    if not matches:
+        return None, ()
+
+    best = matches[0].rank
+    candidates = tuple(m.spec for m in matches if m.rank == best)
+    if best == MATCH_EXACT or len(candidates) == 1:
+        return candidates[0], candidates[:1]
+    return None, candidates
 
 
 def get_trait_list(string):
-    for list in TOTAL_TRAITS:
-        for trait in list[1]:
-            if string in trait:
-
-                # create an object and add the values to it to return
-                # TODO: This is a nightmare driven hell machine. Fix it.
-                # The dark magics of python are at work here.
-                output = {}
-                output["trait"] = trait
-                output["category"] = list[0]
-                output["values"] = list[2][trait]["values"] if trait in list[2] else list[2]["default"]["values"]
-                try:
-                    output["check"] = list[2][trait]["check"] if trait in list[2] else list[
-                        2]["default"]["check"] if "default" in list[2] else lambda x: True
-                except KeyError:
-                    output["check"] = lambda x: True
-                try:
-                    output["check_message"] = list[2][trait]["check_message"] if trait in list[2] else list[
-                        2]["default"]["check_message"] if "default" in list[2] else "Permission denied."
-                except KeyError:
-                    output["check_message"] = "Permission denied."
-
-                try:
-                    output["has_specialties"] = list[2][trait]["has_specialties"] if trait in list[
-                        2] else list[2]["default"]["has_specialties"] if "default" in list[2] else False
-                    output["specialties"] = list[2][trait]["specialties"] if trait in list[
-                        2] else list[2]["default"]["specialties"] if "default" in list[2] else {}
-                except:
-                    output["has_specialties"] = False
-                    output["specialties"] = {}
-
-                try:
-                    output["instanced"] = list[2][trait]["instanced"] if trait in list[
-                        2] else list[2]["default"]["instanced"] if "default" in list[2] else False
-                except:
-                    output["instanced"] = False
-
-                try:
-                    output["instances"] = list[2][trait]["instances"] if trait in list[
-                        2] else list[2]["default"]["instances"] if "default" in list[2] else []
-                except:
-                    output["instances"] = []
-
-                return output
+    """
+    Return the TraitSpec best matching string, picking the first trait in
+    TOTAL_TRAITS order when the match is ambiguous.  Use resolve_trait where
+    ambiguity should be reported instead.
+    """
+    matches = match_traits(string)
+    if matches:
+        return matches[0].spec
 
 # get the category of a trait
 
 
 def get_trait_category(string):
-    for list in TOTAL_TRAITS:
-        for trait in list[1]:
-            if string in trait:
-                return list[0]
+    spec = get_trait_list(string)
+    if spec:
+        return spec.category
+
+
+def _data_paths():
+    return [
+        os.path.join(DATA_DIR, name + ".yaml")
+        for name in ("sheet",) + TRAIT_FILES
+    ]
+
+
+def _read(path):
+    """Read one data file and check its version."""
+    # yaml is only needed when the cache is out of date.
+    import yaml
+
+    name = os.path.basename(path)
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    except OSError as err:
+        raise GameDataError("%s could not be read: %s" % (name, err))
+    except yaml.YAMLError as err:
+        raise GameDataError("%s is not valid YAML: %s" % (name, err))
+
+    if not isinstance(data, dict):
+        raise GameDataError("%s must be a mapping." % name)
+    if data.get("version") != DATA_VERSION:
+        raise GameDataError(
+            "%s is version %s, expected %s."
+            % (name, data.get("version"), DATA_VERSION))
+    return data
+
+
+def _check_entry(name, trait, entry):
+    """Check one entry of a trait file's values."""
+    where = "%s: %s" % (name, trait)
+    if not isinstance(entry, dict):
+        raise GameDataError("%s must be a mapping." % where)
+
+    unknown = set(entry) - ENTRY_KEYS
+    if unknown:
+        raise GameDataError(
+            "%s has unknown keys: %s." % (where, ", ".join(sorted(unknown))))
+    if not isinstance(entry.get("values", []), list):
+        raise GameDataError("%s values must be a list." % where)
+    if not isinstance(entry.get("instances", []), list):
+        raise GameDataError("%s instances must be a list." % where)
+    if not isinstance(entry.get("check", {}), dict):
+        raise GameDataError("%s check must be a mapping." % where)
+
+    specialties = entry.get("specialties", {})
+    if not isinstance(specialties, dict):
+        raise GameDataError("%s specialties must be a mapping." % where)
+    for power, data in specialties.items():
+        if not isinstance(data, dict) or set(data) - POWER_KEYS:
+            raise GameDataError(
+                "%s: %s must be a mapping of %s."
+                % (where, power, " and ".join(sorted(POWER_KEYS))))
+        if not data.get("values") or not isinstance(data["values"], list):
+            raise GameDataError("%s: %s needs a list of values." % (where, power))
+        requires = data.get("requires", {})
+        if not isinstance(requires, dict) or not all(
+            isinstance(x, int) for x in requires.values()
+        ):
+            raise GameDataError(
+                "%s: %s requires must map traits to numbers." % (where, power))
+
+
+def _compile_data():
+    """
+    Read and check every data file.  Returns a dict of this module's table
+    names to their new contents.
+    """
+    paths = dict(zip(("sheet",) + TRAIT_FILES, _data_paths()))
+
+    sheet = _read(paths["sheet"])
+    columns = sheet.get("columns") or {}
+    tables = {
+        "STATS": sheet.get("stats") or {},
+        "SPLATS": sheet.get("splats") or [],
+        "PHYSICAL": columns.get("physical") or [],
+        "MENTAL": columns.get("mental") or [],
+        "SOCIAL": columns.get("social") or [],
+        "TRAIT_ABBREVIATIONS": sheet.get("abbreviations") or {},
+    }
+
+    total_traits = []
+    for name in TRAIT_FILES:
+        data = _read(paths[name])
+        traits = data.get("traits") or []
+        values = data.get("values") or {}
+        if not isinstance(traits, list) or not isinstance(values, dict):
+            raise GameDataError(
+                "%s.yaml needs a list of traits and a mapping of values." % name)
+        for trait, entry in values.items():
+            _check_entry(name, trait, entry)
+
+        tables[name.upper()] = traits
+        tables[name.upper() + "_GOOD_VALUES"] = values
+        total_traits.append((name, traits, values))
+    tables["TOTAL_TRAITS"] = total_traits
+
+    names = {trait for _, traits, _ in total_traits for trait in traits}
+    for short, trait in tables["TRAIT_ABBREVIATIONS"].items():
+        if trait not in names:
+            raise GameDataError(
+                "sheet.yaml: the abbreviation %s is for %s, which is not a "
+                "trait." % (short, trait))
+
+    return tables
+
+
+def _data_hash():
+    digest = hashlib.sha1(b"%d" % CACHE_FORMAT)
+    for path in _data_paths():
+        digest.update(os.path.basename(path).encode())
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            # _read reports the missing file.
+            pass
+    return digest.hexdigest()
+
+
+# tables compiled without being cached, (hash, tables), see write_cache.
+_uncached = None
+
+
+def _save_cache(key, data):
+    try:
+        with open(CACHE_PATH + ".tmp", "wb") as f:
+            pickle.dump({"hash": key, "data": data}, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(CACHE_PATH + ".tmp", CACHE_PATH)
+    except OSError:
+        # a read-only checkout still works, it compiles on every start.
+        pass
+
+
+def load_data(cache=True):
+    """
+    Return the checked tables.  They come from the cache when the files
+    haven't changed since it was written, and are read from the files when
+    they have.  Tables read from the files are cached, unless cache is
+    false, in which case write_cache can cache them later.
+    """
+    global _uncached
+
+    key = _data_hash()
+    try:
+        with open(CACHE_PATH, "rb") as f:
+            cached = pickle.load(f)
+        if cached["hash"] == key:
+            return cached["data"]
+    except Exception:
+        # a missing, stale or broken cache is just compiled again.
+        pass
+
+    data = _compile_data()
+    if cache:
+        _save_cache(key, data)
+        _uncached = None
+    else:
+        _uncached = (key, data)
+    return data
+
+
+def write_cache():
+    """
+    Cache the tables this module compiled when it was imported, if they
+    weren't cached then.  Called by at_server_start.
+    """
+    global _uncached
+
+    if _uncached:
+        _save_cache(*_uncached)
+        _uncached = None
+
+
+_installed = None
+
+
+def _install(tables):
+    """
+    Build the trait registry for tables and copy both into this module, in
+    place.
+    """
+    global _installed
+
+    module = globals()
+    values = dict(tables)
+    values["TRAIT_REGISTRY"], values["TRAIT_MATCHES"] = _build_trait_registry(
+        tables["TOTAL_TRAITS"])
+    for name, value in values.items():
+        current = module[name]
+        if isinstance(current, dict):
+            current.clear()
+            current.update(value)
+        else:
+            current[:] = value
+    _installed = tables
+
+
+def reload_data():
+    """
+    Re-read the data files and rebuild everything compiled from them.  If
+    the files have a mistake in them (GameDataError), or installing them
+    or a reload hook fails, the data from before is put back and the error
+    is raised.  Returns the number of traits loaded.
+    """
+    global DATA_GENERATION
+
+    tables = load_data()
+    previous = _installed
+    generation = DATA_GENERATION
+    try:
+        _install(tables)
+        DATA_GENERATION += 1
+        for hook in RELOAD_HOOKS:
+            hook()
+    except Exception:
+        _install(previous)
+        DATA_GENERATION = generation
+        for hook in RELOAD_HOOKS:
+            hook()
+        raise
+
+    return len(TRAIT_REGISTRY)
+
+
+# importing only reads the cache, see write_cache.
+_install(load_data(cache=False))
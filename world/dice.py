@@ -0,0 +1,239 @@
+"""
+Dice engine shared by roll, rouse and the other V5 commands.
+
+Dice pool expressions such as "str + brawl + 2" are compiled once by
+compile_pool into resolved terms and cached, so rolling a pool only has to
+read the character's stats with evaluate_pool.
+
+Every roll draws a fresh seed from a DiceRoller and rolls its dice from a
+generator seeded with it.  The seed is kept in the roller's log and can be
+shown with the roll, so any roll can be reproduced later with replay().
+
+The default roller is shared by the whole game.  A roller can be attached to
+a character or a room (a scene) with set_roller, e.g. a seeded one for tests
+and benchmarks:
+
+    set_roller(room, DiceRoller(seed=1234))
+"""
+
+import random
+import re
+from collections import Counter, deque
+from functools import lru_cache
+from typing import NamedTuple
+from world.data import RELOAD_HOOKS, resolve_trait
+
+# every face of a d10, and how each one is shown in roll results.
+DIE_FACES = range(1, 11)
+DIE_STRINGS = {
+    face: "|%s%s|n " % ("g" if face >= 6 else "r" if face == 1 else "y", face)
+    for face in DIE_FACES
+}
+
+# how many rolls a roller remembers.
+LOG_SIZE = 200
+
+# how many compiled pool expressions are kept.
+POOL_CACHE_SIZE = 1024
+
+# + and - split a pool into terms.  A - between two letters is left to
+# _compile_term, since it may be part of a name like thin-blood.
+OPERATOR_RE = re.compile(r"\s*(\+|(?<![a-z])-|-(?![a-z]))\s*")
+
+
+class PoolTerm(NamedTuple):
+    """One term of a pool, either a trait or a constant number of dice."""
+    sign: int
+    category: str
+    trait: str
+    constant: int
+
+
+class CompiledPool(NamedTuple):
+    """
+    A compiled pool expression.  ambiguous holds (text, candidates) for terms
+    that matched more than one trait, unknown the terms that matched none.
+    """
+    terms: tuple
+    ambiguous: tuple
+    unknown: tuple
+
+
+def _compile_term(text, sign, terms, ambiguous, unknown):
+    if text.isdigit():
+        terms.append(PoolTerm(sign, None, None, int(text)))
+        return
+
+    spec, candidates = resolve_trait(text)
+    if spec:
+        terms.append(PoolTerm(sign, spec.category, spec.trait, 0))
+    elif candidates:
+        ambiguous.append((text, candidates))
+    elif " " in text:
+        # "str brawl" without a + between them still means both traits.
+        for word in text.split(" "):
+            _compile_term(word, sign, terms, ambiguous, unknown)
+    elif "-" in text:
+        # not a name after all, so "str-brawl" is str - brawl.
+        first, *rest = text.split("-")
+        _compile_term(first, sign, terms, ambiguous, unknown)
+        for word in rest:
+            _compile_term(word, -1, terms, ambiguous, unknown)
+    else:
+        unknown.append(text)
+
+
+@lru_cache(maxsize=POOL_CACHE_SIZE)
+def _compile_pool(expression):
+    terms = []
+    ambiguous = []
+    unknown = []
+
+    sign = 1
+    for part in OPERATOR_RE.split(expression):
+        if part == "+":
+            sign = 1
+        elif part == "-":
+            sign = -1
+        elif part:
+            _compile_term(part, sign, terms, ambiguous, unknown)
+            sign = 1
+
+    return CompiledPool(tuple(terms), tuple(ambiguous), tuple(unknown))
+
+
+# compiled pools hold resolved traits, so they go when the data is reloaded.
+RELOAD_HOOKS.append(_compile_pool.cache_clear)
+
+
+def compile_pool(expression):
+    """
+    Compile a pool expression like "str + brawl - 1" into a CompiledPool.
+    Expressions are normalised first, so "Str+Brawl -1" shares the cached
+    result of "str + brawl - 1".
+    """
+    return _compile_pool(" ".join(expression.lower().split()))
+
+
+def evaluate_pool(pool, stats, perm=False):
+    """
+    Return the number of dice pool is worth for a character's stats.  Temp
+    values replace permanent ones when they are higher, unless perm is set.
+    Traits the character doesn't have, or that aren't numbers, add nothing.
+    """
+    temps = stats.get("temp") or {}
+    total = 0
+    for term in pool.terms:
+        if not term.trait:
+            total += term.sign * term.constant
+            continue
+
+        value = (stats.get(term.category) or {}).get(term.trait)
+        if not isinstance(value, int):
+            continue
+        temp = temps.get(term.trait) or 0
+        if not perm and isinstance(temp, int):
+            value = max(value, temp)
+        total += term.sign * value
+
+    return total
+
+
+def pool_label(pool):
+    """Return the pool as the player should see it, e.g. strength + brawl + 2."""
+    label = ""
+    for term in pool.terms:
+        name = term.trait or str(term.constant)
+        if not label:
+            label = name if term.sign > 0 else "- " + name
+        else:
+            label += (" + " if term.sign > 0 else " - ") + name
+    return label
+
+
+def tally(faces):
+    """
+    Summarise a list of rolled faces.  The faces are counted once and the
+    coloured result string is rendered in face order from the counts.
+    """
+    counts = Counter(faces)
+
+    output = []
+    for face in DIE_FACES:
+        output += [DIE_STRINGS[face]] * counts[face]
+
+    tens = counts[10]
+    res = {}
+    res["output"] = output
+    res["s_list"] = "".join(output)
+    res["count"] = sum(counts[face] for face in DIE_FACES if face >= 6)
+    res["crits"] = (tens // 2) * 2
+    res["tens"] = tens
+    res["ones"] = counts[1]
+
+    return res
+
+
+def replay(seed, *pools):
+    """
+    Roll pools of the given sizes from seed.  Rolling the same sizes from the
+    same seed always gives the same faces.  Returns a list of tally results,
+    one per pool.
+    """
+    rng = random.Random(seed)
+    return [tally(rng.choices(DIE_FACES, k=max(int(dice), 0))) for dice in pools]
+
+
+class DiceRoller:
+    """
+    A source of dice rolls.
+
+    With no seed the roller is seeded from the OS and rolls are random.  With
+    a seed the whole sequence of rolls is fixed, which is what tests and
+    benchmarks want.  Either way each roll is logged with its own seed.
+    """
+
+    def __init__(self, seed=None, log_size=LOG_SIZE):
+        self.rng = random.Random(seed)
+        self.log = deque(maxlen=log_size)
+
+    def new_seed(self, pools):
+        seed = self.rng.getrandbits(64)
+        self.log.append({"seed": seed, "pools": pools})
+        return seed
+
+    def roll(self, *pools):
+        """
+        Roll one or more pools in a single draw.  Returns a tuple of
+        (seed, results) where results holds one tally per pool.
+        """
+        seed = self.new_seed(pools)
+        return seed, replay(seed, *pools)
+
+    def roll_die(self):
+        """Roll a single d10 and return the face."""
+        seed = self.new_seed((1,))
+        return random.Random(seed).choices(DIE_FACES, k=1)[0]
+
+
+DEFAULT_ROLLER = DiceRoller()
+
+
+def get_roller(obj=None):
+    """
+    Return the roller for obj.  A roller set on obj wins, then one set on its
+    location, then the shared default.
+    """
+    for holder in (obj, getattr(obj, "location", None)):
+        roller = holder and holder.ndb.dice_roller
+        if roller:
+            return roller
+    return DEFAULT_ROLLER
+
+
+def set_roller(obj, roller=None):
+    """
+    Attach roller to obj (a character or a room).  Passing None puts obj
+    back on the shared default.
+    """
+    obj.ndb.dice_roller = roller
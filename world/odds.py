@@ -0,0 +1,125 @@
+"""
+Exact odds for V5 dice pools.
+
+The rules are the ones CmdDice uses when it rolls:
+
+    - every die showing 6 or more is a success.
+    - every pair of tens, across regular and hunger dice, adds two more.
+    - 0 successes with a 1 on a hunger die is a bestial failure.
+    - a crit with a ten on a hunger die, and no 1 on a hunger die, is a
+      messy critical.
+
+Instead of rolling, each pool is reduced to a small table of outcomes by
+dynamic programming, one die at a time, and the tables are memoised.  A pool
+of up to 30 dice is a table lookup after its first use.
+"""
+
+from functools import lru_cache
+
+# chance of each kind of face on a d10.
+P_FAIL = 0.4  # 2-5
+P_ONE = 0.1
+P_SUCCESS = 0.4  # 6-9
+P_TEN = 0.1
+
+# the largest pool odds are worked out for.
+MAX_POOL = 30
+
+
+def _ten_class(tens):
+    """
+    Reduce a number of tens to what matters when two groups of dice are
+    combined: none, one, or an even or odd number of two or more.
+    """
+    if tens < 2:
+        return tens
+    return 2 + tens % 2
+
+
+@lru_cache(maxsize=None)
+def _faces(dice, hunger):
+    """
+    Distribution of (successes, tens, ones) for dice d10s, where ones is
+    only tracked (as 0 or 1) for hunger dice.  Built from the distribution
+    for one die fewer.
+    """
+    if dice == 0:
+        return {(0, 0, 0): 1.0}
+
+    dist = {}
+    for (succ, tens, ones), p in _faces(dice - 1, hunger).items():
+        for key, chance in (
+            ((succ, tens, ones), P_FAIL),
+            ((succ, tens, 1 if hunger else 0), P_ONE),
+            ((succ + 1, tens, ones), P_SUCCESS),
+            ((succ + 1, tens + 1, ones), P_TEN),
+        ):
+            dist[key] = dist.get(key, 0.0) + p * chance
+    return dist
+
+
+@lru_cache(maxsize=None)
+def _group(dice, hunger):
+    """
+    Collapse _faces into (successes, ten class, tens >= 1, ones) where
+    successes already includes the crit bonus from pairs inside the group.
+    """
+    dist = {}
+    for (succ, tens, ones), p in _faces(dice, hunger).items():
+        key = (succ + 2 * (tens // 2), _ten_class(tens), tens > 0, ones)
+        dist[key] = dist.get(key, 0.0) + p
+    return dist
+
+
+@lru_cache(maxsize=4096)
+def pool_odds(pool, hunger=0, difficulty=1):
+    """
+    Work out the odds of a roll of pool dice, hunger of them hunger dice,
+    against difficulty.  Hunger is capped at the pool, as in a real roll.
+
+    Returns a dict of:
+        win - chance of at least difficulty successes.
+        critical - chance of winning with at least one pair of tens.
+        messy - chance of a messy critical.
+        bestial - chance of a bestial failure.
+        failure - chance of no successes at all.
+        expected - average number of successes.
+        distribution - tuple of the chance of each number of successes.
+    """
+    pool = max(0, min(int(pool), MAX_POOL))
+    hunger = max(0, min(int(hunger), pool))
+    difficulty = max(1, int(difficulty))
+
+    distribution = {}
+    win = critical = messy = bestial = 0.0
+    for (rsucc, rclass, _, _), rp in _group(pool - hunger, False).items():
+        for (hsucc, hclass, hten, hone), hp in _group(hunger, True).items():
+            p = rp * hp
+
+            # an odd ten on each side makes one more pair.
+            succ = rsucc + hsucc
+            if rclass in (1, 3) and hclass in (1, 3):
+                succ += 2
+            crit = rclass >= 2 or hclass >= 2 or (rclass == 1 and hclass == 1)
+
+            distribution[succ] = distribution.get(succ, 0.0) + p
+            if succ >= difficulty:
+                win += p
+                if crit:
+                    critical += p
+                    if hten and not hone:
+                        messy += p
+            if succ == 0 and hone:
+                bestial += p
+
+    top = max(distribution)
+    distribution = tuple(distribution.get(x, 0.0) for x in range(top + 1))
+    return {
+        "win": win,
+        "critical": critical,
+        "messy": messy,
+        "bestial": bestial,
+        "failure": distribution[0],
+        "expected": sum(x * p for x, p in enumerate(distribution)),
+        "distribution": distribution,
+    }
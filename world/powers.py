@@ -0,0 +1,169 @@
+"""
+Discipline powers and their prerequisites.
+
+A power's prerequisites are data: the "requires" entry of the power in
+DISCIPLINES_GOOD_VALUES maps each trait it needs to the minimum rating,
+e.g. {"obfuscate": 2, "animalism": 3}.  A trait can be a discipline or
+another power, and a power only has to be taken to count.  Every power
+must require at least its own level in its discipline.
+
+The tables are compiled once, when this module is imported, into:
+
+    POWERS - power name -> Power.
+    DISCIPLINE_POWERS - discipline -> its powers, ordered by the rating in
+        the discipline they need.
+    DEPENDENTS - trait -> the powers that require it.
+
+so checking a power is a handful of dict lookups, available_powers makes
+one pass over the powers of the disciplines a character has, and
+broken_dependents only looks at the powers that need the trait that
+changed.  They are rebuilt in place when the game data is reloaded.
+"""
+
+from typing import NamedTuple
+from world.data import DISCIPLINES_GOOD_VALUES, RELOAD_HOOKS, GameDataError
+
+
+class Power(NamedTuple):
+    name: str
+    discipline: str
+    level: int
+    minimum: int  # rating needed in its own discipline
+    requires: tuple  # of (trait, minimum)
+
+
+def _build_power_graph():
+    powers = {}
+    for discipline, entry in DISCIPLINES_GOOD_VALUES.items():
+        for name, power in (entry.get("specialties") or {}).items():
+            if name in powers:
+                raise GameDataError(
+                    "Power %r is in both %s and %s."
+                    % (name, powers[name].discipline, discipline))
+            requires = power.get("requires", {})
+            level = min(power["values"])
+            if requires.get(discipline, 0) < level:
+                raise GameDataError(
+                    "Power %r is level %s, but only requires %s %s."
+                    % (name, level, discipline, requires.get(discipline, 0)))
+            powers[name] = Power(
+                name=name,
+                discipline=discipline,
+                level=level,
+                minimum=requires[discipline],
+                requires=tuple(requires.items()),
+            )
+
+    dependents = {}
+    for power in powers.values():
+        for trait, _ in power.requires:
+            if trait not in powers and trait not in DISCIPLINES_GOOD_VALUES:
+                raise GameDataError(
+                    "Power %r requires %r, which is not a discipline or a "
+                    "power." % (power.name, trait))
+            dependents.setdefault(trait, []).append(power.name)
+
+    by_discipline = {}
+    for power in sorted(powers.values(), key=lambda x: x.minimum):
+        by_discipline.setdefault(power.discipline, []).append(power)
+
+    return (
+        powers,
+        {key: tuple(value) for key, value in by_discipline.items()},
+        {key: tuple(value) for key, value in dependents.items()},
+    )
+
+
+POWERS = {}
+DISCIPLINE_POWERS = {}
+DEPENDENTS = {}
+
+
+def rebuild_power_graph():
+    """Rebuild the power graph from DISCIPLINES_GOOD_VALUES, in place."""
+    graph = _build_power_graph()
+    for current, new in zip((POWERS, DISCIPLINE_POWERS, DEPENDENTS), graph):
+        current.clear()
+        current.update(new)
+
+
+rebuild_power_graph()
+RELOAD_HOOKS.append(rebuild_power_graph)
+
+
+def _rating(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def trait_rating(stats, trait):
+    """
+    Return stats' rating in trait, a discipline or a power.  A power the
+    character has counts as its level.
+    """
+    power = POWERS.get(trait)
+    if power:
+        taken = (stats.get("specialties") or {}).get(power.discipline) or {}
+        return power.level if trait in taken else 0
+    return _rating((stats.get("disciplines") or {}).get(trait))
+
+
+def missing_requirements(stats, power):
+    """
+    Return the (trait, minimum) prerequisites of power that stats doesn't
+    meet.  Unknown powers have none.
+    """
+    power = POWERS.get(power)
+    if not power:
+        return ()
+    return tuple(
+        (trait, minimum)
+        for trait, minimum in power.requires
+        if trait_rating(stats, trait) < minimum
+    )
+
+
+def requirement_message(requirements):
+    """Return e.g. "Obfuscate 2 and Animalism 3 are required." """
+    names = [
+        trait.title() if trait in POWERS else "%s %s" % (trait.title(), minimum)
+        for trait, minimum in requirements
+    ]
+    if len(names) == 1:
+        return "%s is required." % names[0]
+    return "%s and %s are required." % (", ".join(names[:-1]), names[-1])
+
+
+def broken_dependents(stats, trait):
+    """
+    Return the powers stats has taken that require trait, a discipline or
+    a power, more of it than stats has.
+    """
+    taken = stats.get("specialties") or {}
+    return tuple(
+        name
+        for name in DEPENDENTS.get(trait, ())
+        if name in (taken.get(POWERS[name].discipline) or {})
+        and trait in dict(missing_requirements(stats, name))
+    )
+
+
+def available_powers(stats):
+    """
+    Return {discipline: [Power, ...]} of every power stats qualifies for
+    but hasn't taken yet.
+    """
+    taken = stats.get("specialties") or {}
+    available = {}
+    for discipline, rating in (stats.get("disciplines") or {}).items():
+        rating = _rating(rating)
+        for power in DISCIPLINE_POWERS.get(discipline, ()):
+            if power.minimum > rating:
+                break
+            if power.name in (taken.get(discipline) or {}):
+                continue
+            if not missing_requirements(stats, power.name):
+                available.setdefault(discipline, []).append(power)
+    return available
@@ -0,0 +1,140 @@
+"""
+Point in time snapshots of character sheets.
+
+A snapshot is taken when a sheet is submitted or approved and whenever
+staff change it.  Most snapshots only store what changed since the one
+before, as zlib compressed JSON, and every KEYFRAME_INTERVAL-th snapshot
+stores the whole sheet, so rebuilding any snapshot reads at most that many
+rows.
+
+Sheets are compared flattened into {path: value}, where path is the tuple
+of keys down to the value, e.g. ("attributes", "strength").
+"""
+
+import json
+import zlib
+from traits.models import SheetSnapshot
+
+# every this many snapshots the whole sheet is stored.
+KEYFRAME_INTERVAL = 25
+
+
+def flatten(stats, path=()):
+    """Flatten a db.stats dict into {path: value}."""
+    if hasattr(stats, "deserialize"):
+        stats = stats.deserialize()
+
+    flat = {}
+    for key, value in stats.items():
+        if isinstance(value, dict) and value:
+            flat.update(flatten(value, path + (key,)))
+        else:
+            flat[path + (key,)] = value
+    return flat
+
+
+def unflatten(flat):
+    """The reverse of flatten."""
+    stats = {}
+    for path, value in sorted(flat.items(), key=lambda x: len(x[0])):
+        current = stats
+        for key in path[:-1]:
+            current = current.setdefault(key, {})
+        current[path[-1]] = value
+    return stats
+
+
+def _pack(data):
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode(), 9)
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def _rebuild(snapshots):
+    """Apply snapshots, a keyframe and the deltas after it, in order."""
+    flat = {}
+    for snapshot in snapshots:
+        data = _unpack(snapshot.data)
+        if snapshot.full:
+            flat = {tuple(path): value for path, value in data["set"]}
+            continue
+        for path in data["unset"]:
+            flat.pop(tuple(path), None)
+        for path, value in data["set"]:
+            flat[tuple(path)] = value
+    return flat
+
+
+def _snapshot_data(number, current, changes):
+    """
+    Return (full, data) for snapshot number of current, a flattened sheet,
+    with changes, its diff_flat from the snapshot before.
+    """
+    if number % KEYFRAME_INTERVAL == 1:
+        return True, {
+            "set": [[list(path), value] for path, value in current.items()]}
+
+    return False, {
+        "set": [[list(path), new] for path, _, new in changes if path in current],
+        "unset": [list(path) for path, _, _ in changes if path not in current],
+    }
+
+
+def snapshot_flat(snapshot):
+    """Return the flattened sheet stored by snapshot."""
+    keyframe = SheetSnapshot.objects.filter(
+        character_id=snapshot.character_id, full=True, number__lte=snapshot.number
+    ).order_by("-number").values_list("number", flat=True).first()
+
+    return _rebuild(SheetSnapshot.objects.filter(
+        character_id=snapshot.character_id,
+        number__gte=keyframe or 0,
+        number__lte=snapshot.number,
+    ).order_by("number"))
+
+
+def snapshot_stats(snapshot):
+    """Return the db.stats dict stored by snapshot."""
+    return unflatten(snapshot_flat(snapshot))
+
+
+def take_snapshot(character, reason):
+    """
+    Snapshot character's current stats.  Returns the new SheetSnapshot, or
+    None when nothing changed since the last one.
+    """
+    current = flatten(character.db.stats or {})
+    last = SheetSnapshot.objects.filter(character=character).order_by(
+        "-number").first()
+
+    previous = snapshot_flat(last) if last else {}
+    changes = diff_flat(previous, current)
+    if last and not changes:
+        return None
+
+    number = last.number + 1 if last else 1
+    full, data = _snapshot_data(number, current, changes)
+    return SheetSnapshot.objects.create(
+        character=character,
+        number=number,
+        reason=reason[:200],
+        full=full,
+        data=_pack(data),
+    )
+
+
+def diff_flat(old, new):
+    """
+    Return the differences between two flattened sheets as a sorted list of
+    (path, old value, new value).  Missing values are None.
+    """
+    return sorted(
+        (
+            (path, old.get(path), new.get(path))
+            for path in set(old) | set(new)
+            if old.get(path) != new.get(path) or (path in old) != (path in new)
+        ),
+        key=lambda x: x[0],
+    )
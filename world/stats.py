@@ -0,0 +1,129 @@
+"""
+Helpers for the character sheet kept in db.stats.
+
+Anything that changes a character's stats should call stats_changed with the
+categories it touched.  Each category has a version counter, and anything
+derived from the sheet, like the rendered sections of the sheet command,
+can compare versions to see whether it is out of date.
+
+The counters live in ndb, so they start over on a reload along with
+everything cached against them.  Reloading the game data changes every
+version too.
+
+Commands that make several changes at once should make them inside a
+StatsTransaction, which writes db.stats back once at the end and works out
+which categories changed by itself.
+
+stats_changed also mirrors the sheet into the traits table (one row per
+trait, see traits.models) and the search index (world.statsearch), which
+are only read by searches.  db.stats is still written whole.
+"""
+
+from copy import deepcopy
+from traits.models import CharacterTrait
+from world.snapshots import take_snapshot
+from world.statsearch import STAT_INDEX
+import world.data
+
+# bumping this invalidates every category at once.
+ALL_STATS = "*"
+
+
+def stats_changed(character, *categories):
+    """
+    Record that categories of character's stats changed.  With no
+    categories the whole sheet is treated as changed.
+    """
+    versions = character.ndb.stats_versions or {}
+    for category in categories or (ALL_STATS,):
+        versions[category] = versions.get(category, 0) + 1
+    character.ndb.stats_versions = versions
+
+    stats = character.db.stats
+    if stats:
+        CharacterTrait.objects.sync(character, stats, categories)
+        STAT_INDEX.update(character.id, stats)
+
+
+def stats_version(character, categories):
+    """
+    Return a value that changes whenever any of categories of character's
+    stats change.
+    """
+    versions = character.ndb.stats_versions or {}
+    return (world.data.DATA_GENERATION, versions.get(ALL_STATS, 0)) + tuple(
+        versions.get(category, 0) for category in categories
+    )
+
+
+def cached_render(character, key, categories, render):
+    """
+    Return render(character), reusing the last result stored under key for
+    as long as none of categories of character's stats have changed.
+    """
+    version = stats_version(character, categories)
+    cache = character.ndb.render_cache or {}
+
+    hit = cache.get(key)
+    if hit and hit[0] == version:
+        return hit[1]
+
+    output = render(character)
+    cache[key] = (version, output)
+    character.ndb.render_cache = cache
+    return output
+
+
+class StatsTransaction:
+    """
+    Collect changes to a character's stats and save them in one write.
+
+        with StatsTransaction(character) as stats:
+            stats["attributes"]["strength"] = 3
+            del stats["temp"]["strength"]
+
+    stats is a plain copy of db.stats.  When the block ends it is written
+    back once, if anything changed, and stats_changed is called with the
+    categories that did.  If the block raises, or rollback() is called,
+    nothing is written.  With a snapshot reason, a changed sheet is also
+    snapshotted (see world.snapshots).
+    """
+
+    def __init__(self, character, snapshot=None):
+        self.character = character
+        self.snapshot = snapshot
+        self.stats = None
+        self.original = None
+        self.rolled_back = False
+
+    def __enter__(self):
+        stats = self.character.db.stats or {}
+        if hasattr(stats, "deserialize"):
+            stats = stats.deserialize()
+        self.original = deepcopy(stats)
+        self.stats = deepcopy(stats)
+        return self.stats
+
+    def rollback(self):
+        """Throw away everything changed so far."""
+        self.rolled_back = True
+
+    def changed(self):
+        """Return the categories that differ from when the transaction began."""
+        return [
+            category
+            for category in set(self.original) | set(self.stats)
+            if self.original.get(category) != self.stats.get(category)
+        ]
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type or self.rolled_back:
+            return False
+
+        changed = self.changed()
+        if changed:
+            self.character.db.stats = self.stats
+            stats_changed(self.character, *changed)
+            if self.snapshot:
+                take_snapshot(self.character, self.snapshot)
+        return False
@@ -0,0 +1,214 @@
+"""
+Search every character's stats.
+
+STAT_INDEX is an inverted index of trait -> value -> set of character ids,
+with each character's own values kept alongside so they can be taken out
+again.  It is built from the traits table the first time it is searched, one
+query for the whole game, and then kept up to date by stats_changed.
+
+Searches are a comma separated list of filters, all of which must match:
+
+    dominate>=4, approved, clan=brujah
+
+A filter is a trait on its own (the character has it and it isn't 0), or a
+trait, one of = != > >= < <=, and a value.  Traits are matched like the
+stat command matches them, and the plain values of the sheet (splat,
+approved, approved_by, notes) can be searched by name.
+"""
+
+import re
+from traits.models import CharacterTrait, join_key, split_key, stats_rows
+from world.data import STATS, resolve_trait
+
+FILTER_RE = re.compile(r"^(.+?)\s*(>=|<=|!=|=|>|<)\s*([^<>=!\s].*)$")
+
+OPERATORS = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+}
+
+
+class SearchError(ValueError):
+    """A search couldn't be understood."""
+
+
+def _index_key(category, trait, instance):
+    # plain values of the sheet are filed under their own name.
+    return (category, join_key(trait, instance).lower() or category)
+
+
+def _index_value(value, text):
+    return text.lower() if value is None else value
+
+
+def _parse_value(text):
+    text = text.strip().lower()
+    if text.lstrip("-").isdigit():
+        return int(text)
+    if text in ("true", "yes"):
+        return 1
+    if text in ("false", "no"):
+        return 0
+    return text
+
+
+def trait_key(name):
+    """
+    Return the index key for a trait name, e.g. contacts(police), or raise
+    SearchError.
+    """
+    name = name.strip().lower()
+    if name in STATS and not isinstance(STATS[name], dict):
+        return (name, name)
+
+    name, instance = split_key(name)
+    spec, candidates = resolve_trait(name)
+    if not spec and candidates:
+        raise SearchError(
+            "%s is ambiguous.  Did you mean: %s?"
+            % (name, ", ".join(x.trait for x in candidates)))
+    if not spec:
+        raise SearchError("%s is not a trait." % name)
+    return _index_key(spec.category, spec.trait, instance)
+
+
+def parse_filters(query):
+    """Parse a search into a list of (key, operator, value)."""
+    filters = []
+    for part in query.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        match = FILTER_RE.match(part)
+        if match:
+            name, operator, value = match.groups()
+            filters.append((trait_key(name), operator, _parse_value(value)))
+        elif any(x in part for x in "<>=!"):
+            raise SearchError(
+                "%s needs a trait and a value, e.g. dominate>=4." % part)
+        else:
+            filters.append((trait_key(part), None, None))
+    return filters
+
+
+class StatIndex:
+    def __init__(self):
+        self.traits = None  # key -> value -> set of ids
+        self.sheets = {}  # id -> key -> value
+
+    def reset(self):
+        """Throw the index away, it is built again on the next search."""
+        self.traits = None
+        self.sheets = {}
+
+    def _add(self, character_id, key, value):
+        self.traits.setdefault(key, {}).setdefault(value, set()).add(character_id)
+        self.sheets.setdefault(character_id, {})[key] = value
+
+    def _remove(self, character_id):
+        for key, value in self.sheets.pop(character_id, {}).items():
+            ids = self.traits[key][value]
+            ids.discard(character_id)
+            if not ids:
+                del self.traits[key][value]
+
+    def build(self):
+        """Build the index from the traits table."""
+        self.traits = {}
+        self.sheets = {}
+        rows = CharacterTrait.objects.filter(specialty="").values_list(
+            "character_id", "category", "trait", "instance", "value", "text")
+        for character_id, category, trait, instance, value, text in rows:
+            if value is None and not text and trait:
+                continue  # a temp with nothing under it.
+            self._add(
+                character_id,
+                _index_key(category, trait, instance),
+                _index_value(value, text),
+            )
+
+    def update(self, character_id, stats):
+        """Refile a character under their current stats."""
+        if self.traits is None:
+            return
+        self._remove(character_id)
+        for (category, trait, instance, specialty), (value, text, _) in (
+            stats_rows(stats).items()
+        ):
+            if specialty or (value is None and not text and trait):
+                continue
+            self._add(
+                character_id,
+                _index_key(category, trait, instance),
+                _index_value(value, text),
+            )
+
+    def _matching(self, key, operator, value):
+        values = self.traits.get(key, {})
+        if operator is None:
+            matched = [ids for x, ids in values.items() if x not in (0, "")]
+        else:
+            compare = OPERATORS[operator]
+            matched = []
+            for x, ids in values.items():
+                try:
+                    if compare(x, value):
+                        matched.append(ids)
+                except TypeError:
+                    # numbers and words never match each other.
+                    pass
+        return set().union(*matched)
+
+    def search(self, query):
+        """Return the set of ids of the characters matching query."""
+        if self.traits is None:
+            self.build()
+
+        filters = parse_filters(query)
+        if not filters:
+            return set(self.sheets)
+
+        found = sorted(
+            (self._matching(*x) for x in filters), key=len)
+        return found[0].intersection(*found[1:])
+
+    def average(self, trait, by=None, query=""):
+        """
+        Return {group: (average, count)} of trait over the characters
+        matching query, grouped by the value of by.  Without by there is one
+        group, None.  Characters without a number for trait are left out.
+        """
+        key = trait_key(trait)
+        group_key = trait_key(by) if by else None
+
+        totals = {}
+        for character_id in self.search(query):
+            sheet = self.sheets.get(character_id, {})
+            value = sheet.get(key)
+            if not isinstance(value, int):
+                continue
+            group = sheet.get(group_key) if group_key else None
+            total, count = totals.get(group, (0, 0))
+            totals[group] = (total + value, count + 1)
+
+        return {
+            group: (total / count, count)
+            for group, (total, count) in totals.items()
+        }
+
+
+STAT_INDEX = StatIndex()
+
+
+def search(query):
+    """Return the ids of every character matching query."""
+    return STAT_INDEX.search(query)
+
+
+def average(trait, by=None, query=""):
+    """Average trait over the characters matching query, see StatIndex."""
+    return STAT_INDEX.average(trait, by, query)
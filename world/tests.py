@@ -0,0 +1,207 @@
+from itertools import product
+from types import SimpleNamespace
+from django.test import SimpleTestCase
+from world.data import resolve_trait
+from world.dice import compile_pool, evaluate_pool
+from world.odds import pool_odds
+from world.snapshots import (
+    KEYFRAME_INTERVAL,
+    _pack,
+    _rebuild,
+    _snapshot_data,
+    diff_flat,
+    flatten,
+    unflatten,
+)
+from world.statsearch import SearchError, parse_filters
+
+
+def enumerate_odds(pool, hunger):
+    """
+    Roll every combination of faces of pool dice, the first hunger of them
+    hunger dice, and return {difficulty: odds} worked out by counting.
+    """
+    rolls = []
+    for faces in product(range(1, 11), repeat=pool):
+        hunger_faces = faces[:hunger]
+        tens = faces.count(10)
+        successes = sum(face >= 6 for face in faces) + (tens // 2) * 2
+        rolls.append((successes, tens >= 2, 10 in hunger_faces, 1 in hunger_faces))
+
+    total = len(rolls)
+    results = {}
+    for difficulty in range(1, 5):
+        wins = [x for x in rolls if x[0] >= difficulty]
+        results[difficulty] = {
+            "win": len(wins) / total,
+            "critical": sum(1 for x in wins if x[1]) / total,
+            "messy": sum(1 for x in wins if x[1] and x[2] and not x[3]) / total,
+            "bestial": sum(1 for x in rolls if not x[0] and x[3]) / total,
+            "failure": sum(1 for x in rolls if not x[0]) / total,
+            "expected": sum(x[0] for x in rolls) / total,
+        }
+    return results
+
+
+class OddsTest(SimpleTestCase):
+    def test_matches_enumeration(self):
+        for pool in range(5):
+            for hunger in range(pool + 1):
+                for difficulty, expected in enumerate_odds(pool, hunger).items():
+                    odds = pool_odds(pool, hunger, difficulty)
+                    for key, value in expected.items():
+                        with self.subTest(
+                            pool=pool, hunger=hunger, difficulty=difficulty, key=key
+                        ):
+                            self.assertAlmostEqual(odds[key], value)
+
+    def test_distribution_sums_to_one(self):
+        for pool, hunger in ((1, 0), (10, 3), (30, 5)):
+            self.assertAlmostEqual(
+                sum(pool_odds(pool, hunger)["distribution"]), 1.0)
+
+    def test_caps(self):
+        self.assertEqual(pool_odds(3, 7), pool_odds(3, 3))
+        self.assertEqual(pool_odds(-2), pool_odds(0))
+        self.assertEqual(pool_odds(0)["failure"], 1.0)
+
+
+class ResolveTraitTest(SimpleTestCase):
+    def test_exact(self):
+        spec, candidates = resolve_trait("Strength")
+        self.assertEqual(spec.trait, "strength")
+        self.assertEqual(len(candidates), 1)
+
+    def test_abbreviation(self):
+        self.assertEqual(resolve_trait("str")[0].trait, "strength")
+        # com is composure, although co alone is ambiguous.
+        self.assertEqual(resolve_trait("com")[0].trait, "composure")
+
+    def test_unique_prefix(self):
+        self.assertEqual(resolve_trait("dom")[0].trait, "dominate")
+
+    def test_ambiguous(self):
+        spec, candidates = resolve_trait("per")
+        self.assertIsNone(spec)
+        self.assertEqual(
+            {x.trait for x in candidates}, {"performance", "persuasion"})
+
+    def test_unknown(self):
+        self.assertEqual(resolve_trait("zzz"), (None, ()))
+
+
+class CompilePoolTest(SimpleTestCase):
+    def terms(self, expression):
+        return [(x.sign, x.trait, x.constant) for x in compile_pool(expression).terms]
+
+    def test_terms(self):
+        self.assertEqual(
+            self.terms("Str + Brawl - 1"),
+            [(1, "strength", 0), (1, "brawl", 0), (-1, None, 1)],
+        )
+        self.assertEqual(
+            self.terms("str brawl"), [(1, "strength", 0), (1, "brawl", 0)])
+
+    def test_hyphens(self):
+        self.assertEqual(
+            self.terms("str-brawl"), [(1, "strength", 0), (-1, "brawl", 0)])
+        self.assertEqual(
+            self.terms("thin-blood alchemy+1"),
+            [(1, "thin-blood alchemy", 0), (1, None, 1)],
+        )
+
+    def test_unresolved(self):
+        pool = compile_pool("xyz + per + 2")
+        self.assertEqual(pool.unknown, ("xyz",))
+        self.assertEqual([x[0] for x in pool.ambiguous], ["per"])
+        self.assertEqual(self.terms("xyz + per + 2"), [(1, None, 2)])
+
+    def test_evaluate(self):
+        stats = {
+            "attributes": {"strength": 3},
+            "skills": {"brawl": 2},
+            "temp": {"strength": 5},
+        }
+        pool = compile_pool("str + brawl - 1")
+        self.assertEqual(evaluate_pool(pool, stats), 6)
+        self.assertEqual(evaluate_pool(pool, stats, perm=True), 4)
+
+
+class SnapshotTest(SimpleTestCase):
+    def sheets(self, count):
+        """Return count versions of a sheet, each changed a little."""
+        stats = {
+            "splat": "vampire",
+            "attributes": {"strength": 1},
+            "specialties": {},
+            "temp": {},
+        }
+        sheets = []
+        for number in range(1, count + 1):
+            stats = unflatten(flatten(stats))
+            stats["attributes"]["strength"] = number % 5 + 1
+            if number % 3 == 0:
+                stats["specialties"] = {"athletics": {"Running": str(number)}}
+            elif number % 3 == 1:
+                stats["specialties"] = {}
+            if number % 4 == 0:
+                stats["temp"]["strength"] = number
+            else:
+                stats["temp"].pop("strength", None)
+            sheets.append(stats)
+        return sheets
+
+    def test_round_trip_across_keyframes(self):
+        sheets = self.sheets(KEYFRAME_INTERVAL + 5)
+        snapshots = []
+        previous = {}
+        for number, stats in enumerate(sheets, 1):
+            current = flatten(stats)
+            full, data = _snapshot_data(
+                number, current, diff_flat(previous, current))
+            snapshots.append(
+                SimpleNamespace(number=number, full=full, data=_pack(data)))
+            previous = current
+
+        self.assertTrue(snapshots[0].full)
+        self.assertTrue(snapshots[KEYFRAME_INTERVAL].full)
+        self.assertEqual(sum(x.full for x in snapshots), 2)
+
+        for number, stats in enumerate(sheets, 1):
+            keyframe = max(x.number for x in snapshots[:number] if x.full)
+            flat = _rebuild(snapshots[keyframe - 1:number])
+            with self.subTest(number=number):
+                self.assertEqual(flat, flatten(stats))
+                self.assertEqual(unflatten(flat), stats)
+
+    def test_diff(self):
+        old = flatten({"attributes": {"strength": 2, "wits": 1}})
+        new = flatten({"attributes": {"strength": 3}, "splat": "ghoul"})
+        self.assertEqual(diff_flat(old, new), [
+            (("attributes", "strength"), 2, 3),
+            (("attributes", "wits"), 1, None),
+            (("splat",), None, "ghoul"),
+        ])
+
+
+class ParseFiltersTest(SimpleTestCase):
+    def test_filters(self):
+        self.assertEqual(parse_filters("dom>=4, approved, approved = yes,,"), [
+            (("disciplines", "dominate"), ">=", 4),
+            (("approved", "approved"), None, None),
+            (("approved", "approved"), "=", 1),
+        ])
+
+    def test_operators(self):
+        for operator in ("=", "!=", ">", ">=", "<", "<="):
+            with self.subTest(operator=operator):
+                self.assertEqual(
+                    parse_filters("str%s3" % operator),
+                    [(("attributes", "strength"), operator, 3)],
+                )
+
+    def test_malformed(self):
+        for query in ("zzz=1", "per=1", "dominate>=", ">=3", "str=1, zzz"):
+            with self.subTest(query=query):
+                with self.assertRaises(SearchError):
+                    parse_filters(query)